@@ -1,14 +1,26 @@
+import subprocess
+import sys
+
 from dotenv import load_dotenv
 
 from app.chatbot.openai import ChatBot
+from app.config import settings
 from app.embeddings import get_embeddings
 from app.init import initialize_redis_docs, initialize_vector_database, initialize_gradio_app
 from app.store.pg_vector import PGVectorStore
+from app.utils import get_project_root
 
 
 def create_app():
     load_dotenv(override=True)
     initialize_redis_docs()
+    if settings.SERVING_WORKERS > 1:
+        # ingestion spins up torch/tokenizer thread pools; run it in its own process so the
+        # master that forks the workers stays single-threaded
+        subprocess.run([sys.executable, "-m", "scripts.init_vector_db"], cwd=get_project_root(), check=True)
+        from app.serving import serve_prefork
+        serve_prefork()
+        return
     initialize_vector_database()
     vs = PGVectorStore(embeddings=get_embeddings())
     chatbot = ChatBot(vs)
@@ -0,0 +1,187 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+
+from app.config import settings
+from app.store.chunk_file import chunk_id
+from app.store.cutoff import adaptive_cutoff
+from app.utils.admission import admission
+from app.utils.metrics import metrics
+
+DECOMPOSE_PROMPT = """Split the question below into at most {max_queries} standalone search queries for the Redis documentation,
+one per line, with no numbering. Resolve pronouns so every query makes sense on its own.
+If the question asks for one thing only, return it unchanged on a single line.
+
+Question: {question}"""
+
+
+class QueryDecomposer:
+    """
+    Splits compound questions into standalone sub-queries.
+    The heuristics are free; the optional LLM pass only runs when they see a compound cue.
+    The original question is always kept as the first sub-query.
+    """
+
+    # clause boundaries: ';', a '?' followed by more text, and "and <wh-word>"-style connectives
+    SPLIT = re.compile(
+        r"\s*;\s*|\?\s+(?=\S)|\s*,?\s+(?:and|also|plus)\s+(?=(?:how|what|why|when|where|which|whether|can|should|is|are|do|does)\b)",
+        re.IGNORECASE,
+    )
+    COMPARE = re.compile(r"\s+(?:vs\.?|versus|compared (?:to|with))\s+", re.IGNORECASE)
+    COMPARE_LEAD = re.compile(r"^.*?\b(?:compare|comparing|difference between|differences between|between)\s+", re.IGNORECASE)
+    BETWEEN = re.compile(r"\bdifferences? between\s+(.+?)\s+and\s+(.+)$", re.IGNORECASE)
+    SIDE_END = re.compile(r"\s+(?:and|in|for|when|with|on|to)\s+.*$", re.IGNORECASE)
+    # leading question words of a clause, and the verb that follows "how to" / "how do I"
+    QUESTION_LEAD = re.compile(
+        r"^(?:(?:how|what|why|when|where|which|whether|can|could|should|is|are|was|were|do|does|did|"
+        r"i|you|we|there|the|a|an)\s+)*",
+        re.IGNORECASE,
+    )
+    VERB_LEAD = re.compile(r"^(?:.*\b(?:to|i|you|we)\s+)(\w+)(?:\s+(?:up|out|off|on|down|about))?\s+", re.IGNORECASE)
+    PRONOUN = re.compile(r"\b(?:it|they|them)\b|\b(?:this|that|these|those)\s*$", re.IGNORECASE)
+
+    def __init__(self, max_queries: int = 4, llm=None):
+        self.max_queries = max_queries
+        self.llm = llm
+
+    def is_compound(self, question: str) -> bool:
+        text = question.strip().rstrip("?")
+        return bool(self.SPLIT.search(text) or self.COMPARE.search(text) or self.BETWEEN.search(text))
+
+    def decompose(self, question: str) -> list[str]:
+        question = question.strip()
+        if self.max_queries <= 1 or not self.is_compound(question):
+            return [question]
+        parts = self._llm_split(question) if self.llm is not None else None
+        if parts is None:
+            parts = self._heuristic_split(question)
+        return self._dedupe([question, *parts])[: self.max_queries]
+
+    def _heuristic_split(self, question: str) -> list[str]:
+        parts, topic = [], ""
+        for clause in self.SPLIT.split(question.rstrip("?")):
+            clause = clause.strip(" ,")
+            if not clause:
+                continue
+            resolved = bool(topic and self.PRONOUN.search(clause))
+            if resolved:
+                # "how do I trim them" after "what are Redis streams": make it standalone
+                clause = self.PRONOUN.sub(topic, clause)
+            sides = self._comparison_sides(clause)
+            if sides:
+                topic = " and ".join(sides)
+            elif not resolved:
+                topic = self._topic(clause) or topic
+            # a comparison is covered by the original question; search each side on its own
+            parts.extend(sides or [clause])
+        return parts
+
+    def _topic(self, clause: str) -> str:
+        """What a clause is about: "how do I configure AOF" -> "AOF", "what are Redis streams" -> "Redis streams"."""
+        lead = self.QUESTION_LEAD.match(clause).group(0)
+        rest = clause[len(lead):]
+        verb = self.VERB_LEAD.match(clause)
+        if verb and verb.end() > len(lead):
+            rest = clause[verb.end():]
+        return rest.strip()
+
+    def _comparison_sides(self, clause: str) -> list[str]:
+        match = self.BETWEEN.search(clause)
+        sides = list(match.groups()) if match else self.COMPARE.split(clause)
+        if len(sides) != 2:
+            return []
+        left = self._topic(self.COMPARE_LEAD.sub("", sides[0]).strip())
+        tail = self.SIDE_END.search(sides[1])
+        right = sides[1][: tail.start()].strip() if tail else sides[1].strip()
+        # "... for caching" qualifies both sides; a trailing "and ..." starts something else
+        context = tail.group(0).strip() if tail and not tail.group(0).strip().lower().startswith("and ") else ""
+        if not any("redis" in side.lower() for side in (left, right)):
+            # two Redis features ("RDB vs AOF"): anchor both to Redis
+            left, right = f"Redis {left}", f"Redis {right}"
+        # a bare "Redis" side ("Redis vs Memcached") matches everything; the original question covers it
+        sides = [side for side in (left, right) if side and (context or side.lower() != "redis")]
+        return [f"{side} {context}".strip() for side in sides]
+
+    def _llm_split(self, question: str) -> list[str] | None:
+        try:
+            with admission.stage("llm"):
+                response = self.llm.invoke([HumanMessage(content=DECOMPOSE_PROMPT.format(max_queries=self.max_queries, question=question))])
+        except Exception as e:
+            print(f"Query decomposition failed, using heuristics: {e}")
+            metrics.incr("fanout.llm_errors")
+            return None
+        lines = [re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip() for line in str(response.content).splitlines()]
+        return [line for line in lines if line] or None
+
+    @staticmethod
+    def _dedupe(queries: list[str]) -> list[str]:
+        seen, out = set(), []
+        for q in queries:
+            key = re.sub(r"\W+", " ", q.lower()).strip()
+            if key and key not in seen:
+                seen.add(key)
+                out.append(q)
+        return out
+
+
+def reciprocal_rank_fusion(
+        ranked_lists: list[list[Document]],
+        k: int,
+        rrf_k: int = 60,
+        min_per_list: int | None = None,
+) -> list[Document]:
+    """
+    Merges ranked lists by sum of 1 / (rrf_k + rank); duplicates collapse into one entry.
+    The top `min_per_list` results of every list are always kept (default: an even share
+    of half the budget), so a sub-query's best hits are not crowded out by chunks that
+    rank low in every list. The rest of the k budget is filled by fused score.
+    """
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, 1):
+            key = chunk_id(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+
+    if min_per_list is None:
+        min_per_list = max(1, k // (2 * max(len(ranked_lists), 1)))
+    keep: dict[str, None] = {}
+    for ranked in ranked_lists:
+        for doc in ranked[:min_per_list]:
+            if len(keep) < k:
+                keep.setdefault(chunk_id(doc))
+    for key in sorted(scores, key=scores.get, reverse=True):
+        if len(keep) >= k:
+            break
+        keep.setdefault(key)
+    return [docs[key] for key in sorted(keep, key=scores.get, reverse=True)]
+
+
+class FanOutRetriever:
+    """
+    Searches the store once per sub-query vector, concurrently, and fuses the results into k chunks.
+    Every search takes its own "db" admission slot, so a fan-out counts as that many queries.
+    """
+
+    def __init__(self, vs, max_workers: int = 4, rrf_k: int = 60):
+        self.vs = vs
+        self.rrf_k = rrf_k
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout")
+
+    def _search(self, vector: list[float], k: int) -> list[Document]:
+        with admission.stage("db"):
+            results = self.vs.get_with_scores_by_vector(vector, k)
+        if settings.RETRIEVAL_ADAPTIVE_K:
+            return adaptive_cutoff(results, max_k=k)
+        return [doc for doc, _ in results]
+
+    def search(self, vectors: list[list[float]], k: int | None = None) -> list[Document]:
+        k = k or settings.CHUNK_RETRIVAL_SIZE
+        ranked_lists = list(self._pool.map(lambda v: self._search(v, k), vectors))
+        fused = reciprocal_rank_fusion(ranked_lists, k, self.rrf_k)
+        metrics.observe("fanout.candidates", sum(len(r) for r in ranked_lists))
+        metrics.observe("fanout.unique_candidates", len({chunk_id(d) for r in ranked_lists for d in r}))
+        return fused
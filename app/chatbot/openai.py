@@ -1,29 +1,141 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
 from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, convert_to_messages
 from langchain_openai import ChatOpenAI
 
-from app.prompts.system import SYSTEM_PROMPT
+from app.chatbot.fanout import QueryDecomposer, FanOutRetriever
+from app.chatbot.router import QueryRouter, Route
+from app.config import settings
+from app.embeddings import BatchingEmbeddings
+from app.prompts.system import SYSTEM_PROMPT, CONTEXT_PROMPT
 from app.store.pg_vector import PGVectorStore
+from app.utils.admission import admission, Overloaded
+from app.utils.metrics import metrics
+
+
+def _message_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(_message_text(part) for part in content)
+    if isinstance(content, dict):
+        return str(content.get("text", ""))
+    return ""
+
+
+def _answer_key(answer: str) -> str:
+    return hashlib.sha1(answer.strip().encode("utf-8")).hexdigest()
 
 
 class ChatBot:
     def __init__(self, vs: PGVectorStore):
-        self.llm = ChatOpenAI()
+        self.llm = ChatOpenAI(base_url=settings.OPENAI_BASE_URL or None, max_retries=settings.OPENAI_MAX_RETRIES)
         self.vs = vs
+        self.router = QueryRouter() if settings.ROUTER_ENABLED else None
+        self.decomposer = None
+        self.fanout = None
+        if settings.FANOUT_ENABLED:
+            self.decomposer = QueryDecomposer(
+                max_queries=settings.FANOUT_MAX_SUBQUERIES,
+                llm=self.llm if settings.FANOUT_USE_LLM else None,
+            )
+            self.fanout = FanOutRetriever(vs, max_workers=settings.FANOUT_MAX_WORKERS, rrf_k=settings.FANOUT_RRF_K)
+        # context used for each answer, keyed by the answer text; the next turn finds it
+        # through the last assistant message in its history, so no session state is needed
+        self._contexts: OrderedDict[str, list] = OrderedDict()
+        self._contexts_lock = threading.Lock()
 
     def generate(self, system_message: SystemMessage, human_message: HumanMessage, history_messages: list[BaseMessage] = []):
         messages: list[BaseMessage] = [system_message]
         messages.extend(history_messages)
         messages.append(human_message)
         response = self.llm.invoke(messages)
+        self._record_usage(response)
         return response.content
 
+    @staticmethod
+    def _record_usage(response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens", 0)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        metrics.incr("llm.input_tokens", input_tokens)
+        metrics.incr("llm.cached_tokens", cached_tokens)
+        metrics.observe("llm.cached_ratio", cached_tokens / input_tokens if input_tokens else 0.0)
+
+    def _previous_context(self, history) -> list | None:
+        for item in reversed(history or []):
+            role = item.get("role") if isinstance(item, dict) else None
+            if role == "assistant":
+                key = _answer_key(_message_text(item.get("content")))
+                with self._contexts_lock:
+                    chunks = self._contexts.get(key)
+                    if chunks is not None:
+                        self._contexts.move_to_end(key)
+                    return chunks
+        return None
+
+    def _remember_context(self, answer: str, chunks: list | None):
+        if chunks is None:
+            return
+        with self._contexts_lock:
+            self._contexts[_answer_key(answer)] = chunks
+            while len(self._contexts) > settings.ROUTER_CONTEXT_CACHE_SIZE:
+                self._contexts.popitem(last=False)
+
+    def _retrieve(self, message, history) -> tuple[Route, list | None]:
+        """Returns the route taken and the chunks to answer with (None = no context at all)."""
+        previous = self._previous_context(history)
+        route = self.router.route(message, previous is not None) if self.router else Route.RETRIEVE
+        metrics.incr(f"router.{route.value}")
+
+        if route is Route.SKIP:
+            metrics.incr("router.saved_retrievals")
+            return route, None
+        if route is Route.REUSE:
+            metrics.incr("router.saved_retrievals")
+            return route, previous
+        with metrics.timer("chat.retrieval_ms"):
+            subqueries = self.decomposer.decompose(message) if self.decomposer else [message]
+            if len(subqueries) > 1:
+                # compound question: one embedding batch, concurrent searches, rank fusion
+                metrics.incr("fanout.questions")
+                metrics.observe("fanout.subqueries", len(subqueries))
+                with admission.stage("embedding"):
+                    vectors = self.vs.embeddings.embed_documents(subqueries)
+                return route, self.fanout.search(vectors)
+            # the batcher admits per batch; a slot held per caller would cap the batch size
+            batched = isinstance(self.vs.embeddings, BatchingEmbeddings)
+            with nullcontext() if batched else admission.stage("embedding"):
+                vector = self.vs.embeddings.embed_query(message)
+            with admission.stage("db"):
+                return route, self.vs.get_by_vector(vector)
+
     def get_chat_function(self):
         def redis_chat(message, history):
-            relevant_chunks = self.vs.get(message)
-            context = "\n\n".join(chunk.page_content for chunk in relevant_chunks)
-            system_prompt = SYSTEM_PROMPT.format(context=context)
-            system_message = SystemMessage(content=system_prompt)
-            history_messages = convert_to_messages(history)
-            human_message = HumanMessage(content=message)
-            return self.generate(system_message, human_message, history_messages)
-        return redis_chat
\ No newline at end of file
+            try:
+                with metrics.timer("chat.total_ms"):
+                    route, relevant_chunks = self._retrieve(message, history)
+                    # static system prompt -> history -> context + question, so consecutive
+                    # requests share the longest possible prefix for provider prompt caching
+                    system_message = SystemMessage(content=SYSTEM_PROMPT)
+                    history_messages = convert_to_messages(history)
+                    if relevant_chunks is None:
+                        human_message = HumanMessage(content=message)
+                    else:
+                        context = "\n\n".join(chunk.page_content for chunk in relevant_chunks)
+                        human_message = HumanMessage(content=CONTEXT_PROMPT.format(context=context, question=message))
+                    with admission.stage("llm"), metrics.timer("chat.llm_ms"):
+                        answer = self.generate(system_message, human_message, history_messages)
+                    # small talk carries the previous context forward for later follow-ups
+                    self._remember_context(answer, relevant_chunks if route is not Route.SKIP else self._previous_context(history))
+                    return answer
+            except Overloaded:
+                metrics.incr("chat.rejected")
+                raise
+            except Exception:
+                metrics.incr("chat.errors")
+                raise
+        return redis_chat
@@ -0,0 +1,72 @@
+import re
+from enum import Enum
+
+from app.utils.text import normalize, tokens
+
+
+class Route(str, Enum):
+    SKIP = "skip"          # small talk: answer without retrieval
+    REUSE = "reuse"        # follow-up on the previous answer: reuse the previous turn's context
+    RETRIEVE = "retrieve"  # new information need: retrieve fresh context
+
+
+class QueryRouter:
+    """
+    Cheap rule-based per-turn routing; no model calls.
+    REUSE is only chosen when the previous turn's context is available.
+    """
+
+    SMALL_TALK = re.compile(
+        r"^(hi|hello|hey|yo|thanks|thank you|thank you so much|thx|ty|ok|okay|cool|great|nice|awesome|perfect|"
+        r"got it|understood|bye|goodbye|see you|good (morning|afternoon|evening)|how are you|who are you)"
+        r"( (a lot|again|very much|mate|there))?$"
+    )
+    REWRITE = re.compile(
+        r"\b(shorten|shorter|summari[sz]e|summary|rephrase|reword|simplify|simpler|tl;?dr|translate|"
+        r"bullet points?|more concise|more detail|elaborate|explain (that|it|this) (again|differently)|"
+        r"in (one|two|three|\d+) (sentences?|lines?|words|paragraphs?))\b"
+    )
+    # "what's" / "doesn't": the leftover "s" / "t" would otherwise count as a new term
+    CONTRACTION = re.compile(r"n't\b|'(?:s|re|ll|d|ve|m)\b")
+    REFERENCE = re.compile(r"\b(that|this|it|those|these|above|previous|your answer|the example|same)\b")
+
+    # words that carry no new information need on their own
+    FILLER = {
+        "a", "an", "the", "and", "or", "but", "so", "to", "of", "in", "on", "for", "with", "about", "as",
+        "is", "are", "was", "be", "do", "does", "did", "can", "could", "would", "will", "should", "please",
+        "you", "me", "i", "we", "my", "your", "it", "that", "this", "those", "these", "above", "previous",
+        "same", "again", "more", "just", "also", "then", "now", "what", "why", "how", "which", "mean",
+        "give", "show", "tell", "explain", "example", "examples", "answer", "one", "another", "thanks", "ok",
+        "not",
+    }
+    # the vocabulary of REWRITE requests; any other non-filler word names new content to retrieve
+    REWRITE_TERMS = {
+        "shorten", "shorter", "summarize", "summarise", "summary", "rephrase", "reword", "simplify", "simpler",
+        "tl", "dr", "tldr", "translate", "bullet", "bullets", "point", "points", "concise", "detail", "details",
+        "detailed", "elaborate", "differently", "sentence", "sentences", "line", "lines", "word", "words",
+        "paragraph", "paragraphs", "two", "three", "into",
+    }
+
+    def __init__(self, max_follow_up_tokens: int = 12):
+        self.max_follow_up_tokens = max_follow_up_tokens
+
+    def route(self, message: str, has_previous_context: bool) -> Route:
+        text = self.CONTRACTION.sub(lambda m: " not" if m.group(0) == "n't" else "", normalize(message).replace("\u2019", "'"))
+        text = re.sub(r"[^\w\s;']", " ", text)
+        text = re.sub(r"\s+", " ", text).strip()
+        if not text or self.SMALL_TALK.match(text):
+            return Route.SKIP
+
+        if not has_previous_context:
+            return Route.RETRIEVE
+
+        toks = tokens(text)
+        new_terms = [t for t in toks if t not in self.FILLER and t not in self.REWRITE_TERMS and not t.isdigit()]
+        # "summarize that" reuses; "summarize how Sentinel failover works" names a new topic
+        if self.REWRITE.search(text) and not new_terms and len(toks) <= self.max_follow_up_tokens:
+            return Route.REUSE
+
+        if self.REFERENCE.search(text) and not new_terms:
+            return Route.REUSE
+
+        return Route.RETRIEVE
@@ -4,13 +4,48 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     HF_TOKEN: str = "your_huggingface_token_here"
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # "torch" or "onnx"
+    EMBEDDING_ONNX_QUANTIZATION: str = ""  # "", "avx2", "avx512", "avx512_vnni" or "arm64" (dynamic int8)
+    EMBEDDING_ONNX_CACHE_DIR: str = ".onnx-models"
+    EMBEDDING_BATCHING_ENABLED: bool = False
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 3.0
     LLM_MODEL: str = "gpt-4.1-mini"
     MD_DOCS_PATH: str = "redis-docs"
     OPENAI_API_KEY: str = "your_openai_api_key_here"
+    OPENAI_BASE_URL: str = ""  # e.g. http://localhost:8089/v1 for scripts/llm_stub_server.py
+    OPENAI_MAX_RETRIES: int = 2
 
     CHUNKS_BATCH_SIZE: int = 1000
     COLLECTION_NAME: str = "redis-knowledge-base"
-    CHUNK_RETRIVAL_SIZE: int = 10
+    CHUNK_RETRIVAL_SIZE: int = 10  # also the max k when RETRIEVAL_ADAPTIVE_K is on
+    RETRIEVAL_ADAPTIVE_K: bool = False
+    RETRIEVAL_MIN_K: int = 2
+    RETRIEVAL_MIN_SIMILARITY: float = 0.35
+    RETRIEVAL_MIN_SCORE_GAP: float = 0.08
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.9  # estimated Jaccard similarity over 5-word shingles
+    DEDUP_NUM_PERM: int = 64
+    DEDUP_BANDS: int = 16
+    CHUNK_STORE_ENABLED: bool = True  # write a local chunk file per collection at ingestion
+    CHUNK_STORE_DIR: str = ".chunk-store"
+    CHUNK_STORE_CACHE_SIZE: int = 4096
+    RETRIEVAL_ID_ONLY: bool = False  # vector search returns ids + scores; texts come from the chunk file
+    ROUTER_ENABLED: bool = True
+    ROUTER_CONTEXT_CACHE_SIZE: int = 2048
+    FANOUT_ENABLED: bool = False  # split compound questions into sub-queries and fuse their results
+    FANOUT_MAX_SUBQUERIES: int = 4  # including the original question
+    FANOUT_USE_LLM: bool = False  # decompose with an LLM call instead of the local heuristics
+    FANOUT_MAX_WORKERS: int = 4
+    FANOUT_RRF_K: int = 60
+    COLLECTION_ALIAS_REFRESH_SECONDS: float = 30.0
+
+    REINDEX_BATCH_SIZE: int = 200
+    REINDEX_THROTTLE_SECONDS: float = 0.5
+    REINDEX_EMBEDDING_THREADS: int = 2  # 0 = leave torch defaults
+    REINDEX_SMOKE_QUESTIONS: int = 25
+    REINDEX_MIN_HIT_RATE: float = 0.6
+    REINDEX_KEEP_VERSIONS: int = 1
 
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "postgres"
@@ -21,9 +56,38 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: str = ""
+    # schema for newly created indexes; existing indexes keep the schema they were built with
+    REDIS_INDEX_ALGORITHM: str = "HNSW"  # "HNSW" or "FLAT"
+    REDIS_DISTANCE_METRIC: str = "COSINE"  # "COSINE", "IP" or "L2"; scores are converted to cosine similarity
+    REDIS_VECTOR_DATATYPE: str = "FLOAT32"  # "FLOAT16" halves vector memory; switch via a re-index
+    REDIS_HNSW_M: int = 16
+    REDIS_HNSW_EF_CONSTRUCTION: int = 200
+    REDIS_HNSW_EF_RUNTIME: int = 10
+    REDIS_TAG_FIELDS: str = "source"  # comma-separated metadata fields stored and indexed as TAG
+    REDIS_TEXT_FIELDS: str = ""  # comma-separated metadata fields stored and indexed as TEXT
 
     GRADIO_SERVER_NAME: str = "0.0.0.0"
     GRADIO_SERVER_PORT: int = 7860
+    GRADIO_CONCURRENCY_LIMIT: int = 32
+    GRADIO_QUEUE_MAX_SIZE: int = 128  # requests dequeued behind a longer queue get the "overloaded" answer
+    GRADIO_QUEUE_HARD_MAX_SIZE: int = 1024  # Gradio's own bound (it rejects with a bare "Queue is full")
+    METRICS_LOG_INTERVAL_SECONDS: float = 60.0  # periodic JSON metrics line per process; 0 = off
+
+    SERVING_WORKERS: int = 1  # > 1 = pre-fork mode: workers listen on GRADIO_SERVER_PORT+1..N behind a balancer
+    # in pre-fork mode the ADMISSION_*_CONCURRENCY and GRADIO_* limits are split evenly across workers
+    WORKER_TORCH_THREADS: int = 0  # 0 = CPU count / SERVING_WORKERS
+    WORKER_HEALTH_INTERVAL_SECONDS: float = 5.0
+    WORKER_HEALTH_FAILURES: int = 3
+    WORKER_START_TIMEOUT_SECONDS: float = 120.0
+    WORKER_SHUTDOWN_TIMEOUT_SECONDS: float = 30.0
+
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_EMBEDDING_CONCURRENCY: int = 4
+    ADMISSION_DB_CONCURRENCY: int = 8
+    ADMISSION_LLM_CONCURRENCY: int = 16
+    ADMISSION_MAX_WAIT_SECONDS: float = 5.0
+    SESSION_RATE_LIMIT_PER_MINUTE: int = 20
+    SESSION_RATE_LIMIT_BURST: int = 5
 
     @property
     def POSTGRES_DB_URI(self) -> str:
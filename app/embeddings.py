@@ -1,8 +1,127 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 
 from app.config import settings
+from app.utils.admission import admission
+from app.utils.file import get_abs_path
+from app.utils.metrics import metrics
+
+
+def get_embeddings(backend: str | None = None):
+    embeddings = build_embeddings(backend or settings.EMBEDDING_BACKEND)
+    if settings.EMBEDDING_BATCHING_ENABLED:
+        return BatchingEmbeddings(
+            embeddings,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+        )
+    return embeddings
+
+
+def build_embeddings(backend: str = "torch", model_name: str | None = None) -> HuggingFaceEmbeddings:
+    model_name = model_name or settings.EMBEDDING_MODEL
+    if backend == "torch":
+        return HuggingFaceEmbeddings(model_name=model_name)
+    if backend == "onnx":
+        model_path, file_name = _prepare_onnx_model(model_name, settings.EMBEDDING_ONNX_QUANTIZATION)
+        model_kwargs = {"backend": "onnx"}
+        if file_name:
+            model_kwargs["model_kwargs"] = {"file_name": file_name}
+        return HuggingFaceEmbeddings(model_name=model_path, model_kwargs=model_kwargs)
+    raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'torch' or 'onnx')")
+
+
+def _prepare_onnx_model(model_name: str, quantization: str = "") -> tuple[str, str | None]:
+    """
+    Returns (model path, onnx file name) for the ONNX Runtime backend.
+    Without quantization the model hub's ONNX export is used as-is. With a
+    quantization config the model is exported once with dynamic int8
+    quantization into EMBEDDING_ONNX_CACHE_DIR and loaded from there.
+    """
+    if not quantization:
+        return model_name, None
+
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    local_dir = get_abs_path(settings.EMBEDDING_ONNX_CACHE_DIR) / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+    if not (local_dir / file_name).exists():
+        print(f"Exporting int8 ({quantization}) ONNX model for {model_name} -> {local_dir}")
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(str(local_dir))
+        export_dynamic_quantized_onnx_model(model, quantization, str(local_dir))
+    return str(local_dir), file_name
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Collects `embed_query` calls arriving from concurrent requests within a short
+    window (or until `max_batch_size` queries are waiting) and encodes them in a
+    single `embed_documents` call. `embed_documents` is passed straight through.
+    Each batch takes one "embedding" admission slot, so callers of `embed_query` must
+    not hold one themselves: that would cap the batch size at the stage limit.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 3.0):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._worker_pid: int | None = None
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
 
+    def _ensure_worker(self):
+        # started lazily and per process, so the wrapper survives a fork
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
 
-def get_embeddings():
-    return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+    def _collect_batch(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
 
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+            metrics.observe("embedding.batch_size", len(batch))
+            try:
+                with admission.stage("embedding"), metrics.timer("embedding.batch_ms"):
+                    vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
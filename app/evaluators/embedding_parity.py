@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.embeddings import build_embeddings
+from app.evaluators.retrieval.retrieval import TestQuestion, RetrievalEvaluator, average_metrics
+from app.ingestion.chunker import DocumentChunker
+from app.store.memory_vector import InMemoryStore
+from app.utils import load_jsonl
+
+
+def _cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return np.sum(a * b, axis=1)
+
+
+def _evaluate_backend(embeddings, chunks, questions: list[TestQuestion], evaluator: RetrievalEvaluator) -> dict:
+    store = InMemoryStore(embeddings=embeddings)
+
+    start = time.perf_counter()
+    store.add(chunks)
+    ingest_s = time.perf_counter() - start
+
+    latencies = []
+    metrics = []
+    for q in questions:
+        start = time.perf_counter()
+        documents = store.get(q.question)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        metrics.append(evaluator.evaluate(q, documents))
+
+    return {
+        "ingest_s": ingest_s,
+        "query_ms_p50": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        **average_metrics(metrics),
+    }
+
+
+def evaluate_embedding_parity(candidate_backend: str = "onnx", max_chunks: int = 2000, max_questions: int | None = None):
+    """
+    Compares a candidate embedding backend against the PyTorch baseline:
+    - cosine drift between baseline and candidate vectors for the same texts
+    - retrieval metric drift (RetrievalEvaluator) on an in-memory index built from a chunk sample
+    """
+    rows = load_jsonl("app/queries/queries.jsonl")
+    questions = [TestQuestion.model_validate(r) for r in rows[:max_questions]]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = DocumentChunker(splitter=splitter).doc_to_chunks()
+    step = max(1, len(chunks) // max_chunks)
+    chunks = chunks[::step][:max_chunks]
+
+    baseline = build_embeddings("torch")
+    candidate = build_embeddings(candidate_backend)
+
+    texts = [q.question for q in questions] + [c.page_content for c in chunks[:500]]
+    cos = _cosine_rows(np.array(baseline.embed_documents(texts)), np.array(candidate.embed_documents(texts)))
+
+    evaluator = RetrievalEvaluator(min_keyword_hits=2)
+    base_report = _evaluate_backend(baseline, chunks, questions, evaluator)
+    cand_report = _evaluate_backend(candidate, chunks, questions, evaluator)
+
+    print("========== Embedding Parity ==========")
+    print(f"Candidate backend      : {candidate_backend}")
+    print(f"Texts compared         : {len(texts)}")
+    print(f"Cosine mean / min      : {cos.mean():.5f} / {cos.min():.5f}")
+    print(f"Cosine p5              : {np.percentile(cos, 5):.5f}")
+    print("--------------------------------------")
+    print(f"{'':<22} {'torch':>10} {candidate_backend:>10} {'delta':>10}")
+    for key in ("hit", "mrr", "ndcg", "ingest_s", "query_ms_p50"):
+        b, c = base_report[key], cand_report[key]
+        print(f"{key:<22} {b:>10.4f} {c:>10.4f} {c - b:>+10.4f}")
+    print("======================================")
+
+    return {
+        "cosine_mean": float(cos.mean()),
+        "cosine_min": float(cos.min()),
+        "baseline": base_report,
+        "candidate": cand_report,
+    }
@@ -1,7 +1,11 @@
+import itertools
+
+from app.config import settings
+from app.store.cutoff import adaptive_cutoff
 from app.store.pg_vector import PGVectorStore
 from app.embeddings import get_embeddings
 from app.utils import load_jsonl
-from app.evaluators.retrieval.retrieval import TestQuestion, RetrievalEvaluator
+from app.evaluators.retrieval.retrieval import TestQuestion, RetrievalEvaluator, average_metrics
 
 
 def evaluate_retrieval_single_question():
@@ -20,11 +24,22 @@ def evaluate_retrieval_single_question():
     print(metrics.model_dump_json(indent=2))
 
 
-def evaluate_batch_queries():
+def evaluate_batch_queries(snapshot_path: str | None = None):
+    """
+    Evaluates every test question against the live store. With snapshot_path the
+    retrieved chunks are also recorded, so replay_retrieval_snapshot can re-score
+    and re-plot them later without the embedding model or the database.
+    """
 
     queries = load_jsonl("app/queries/queries.jsonl")
 
     vs = PGVectorStore(embeddings=get_embeddings())
+    if snapshot_path:
+        from app.evaluators.snapshot import record_retrieval_snapshot, replay_retrieval_snapshot
+        record_retrieval_snapshot(vs, out_path=snapshot_path)
+        replay_retrieval_snapshot(snapshot_path, out_dir="plots/retrieval")
+        return
+
     evaluator = RetrievalEvaluator(min_keyword_hits=2)
     i = 1
     metrics_to_plot = []
@@ -40,4 +55,41 @@ def evaluate_batch_queries():
         })
         i += 1
     from app.evaluators.retrieval.plot import generate_retrieval_report
-    generate_retrieval_report(metrics_to_plot, out_dir="plots/retrieval", show=False)
\ No newline at end of file
+    generate_retrieval_report(metrics_to_plot, out_dir="plots/retrieval", show=False)
+
+
+def evaluate_adaptive_cutoffs(
+        min_similarities: tuple[float, ...] = (0.0, 0.25, 0.3, 0.35, 0.4, 0.45),
+        min_gaps: tuple[float, ...] = (1.0, 0.05, 0.08, 0.12),
+        min_ks: tuple[int, ...] = (1, 2, 3),
+):
+    """
+    Fetches the top CHUNK_RETRIVAL_SIZE chunks with scores once per question, then replays
+    every cutoff configuration offline and reports quality against the average k kept.
+    min_gap=1.0 disables the gap rule; min_similarity=0.0 disables the threshold rule.
+    """
+    queries = load_jsonl("app/queries/queries.jsonl")
+
+    vs = PGVectorStore(embeddings=get_embeddings())
+    evaluator = RetrievalEvaluator(min_keyword_hits=2)
+    questions = [TestQuestion.model_validate(q) for q in queries]
+    scored = [vs.get_with_scores(q.question, k=settings.CHUNK_RETRIVAL_SIZE) for q in questions]
+
+    def _score(docs_per_question) -> dict:
+        metrics = [evaluator.evaluate(q, docs) for q, docs in zip(questions, docs_per_question)]
+        return {
+            **average_metrics(metrics, fields=("hit", "mrr", "ndcg", "keyword_coverage")),
+            "avg_k": sum(len(d) for d in docs_per_question) / max(len(docs_per_question), 1),
+        }
+
+    rows = [{"config": f"fixed k={settings.CHUNK_RETRIVAL_SIZE}", **_score([[d for d, _ in s] for s in scored])}]
+    for min_k, min_sim, min_gap in itertools.product(min_ks, min_similarities, min_gaps):
+        docs = [adaptive_cutoff(s, min_k=min_k, min_similarity=min_sim, min_gap=min_gap) for s in scored]
+        rows.append({"config": f"min_k={min_k} sim>={min_sim:.2f} gap>={min_gap:.2f}", **_score(docs)})
+
+    print("========== Adaptive Cutoff Sweep ==========")
+    print(f"{'config':<34} {'avg_k':>6} {'hit':>6} {'mrr':>6} {'ndcg':>6} {'kwcov':>6}")
+    for r in sorted(rows, key=lambda r: r["avg_k"]):
+        print(f"{r['config']:<34} {r['avg_k']:>6.2f} {r['hit']:>6.3f} {r['mrr']:>6.3f} {r['ndcg']:>6.3f} {r['keyword_coverage']:>6.1f}")
+    print("===========================================")
+    return rows
@@ -1,6 +1,11 @@
-import matplotlib.pyplot as plt
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
+import matplotlib.pyplot as plt
+import numpy as np
+
 from app.utils import get_abs_path
 
 
@@ -243,6 +248,412 @@ def plot_failures_hit0(
     _save_or_show(save_path, dpi=dpi, show=show)
 
 
+# ---------------------------
+# Configuration sweep (Pareto)
+# ---------------------------
+def _sweep_label(r: dict) -> str:
+    return f"{r['model']} cs={r['chunk_size']} ov={r['chunk_overlap']} k={r['k']}"
+
+
+def pareto_front(rows: list[dict], quality: str, cost: str) -> list[dict]:
+    """
+    Rows not dominated by any other row (higher-or-equal quality at lower-or-equal cost),
+    sorted by cost.
+    """
+    ordered = sorted(rows, key=lambda r: (r[cost], -r[quality]))
+    front = []
+    best = float("-inf")
+    for r in ordered:
+        if r[quality] > best:
+            front.append(r)
+            best = r[quality]
+    return front
+
+
+def plot_sweep_pareto(
+        rows: list[dict],
+        cost: str = "query_ms_p50",
+        cost_label: str = "Query latency p50 (ms)",
+        quality_metrics: tuple[str, ...] = ("hit", "mrr", "ndcg"),
+        save_path: str | None = None,
+        dpi: int = 200,
+        show: bool = True,
+):
+    fig, axes = plt.subplots(1, len(quality_metrics), figsize=(6 * len(quality_metrics), 5.5), squeeze=False)
+
+    for ax, metric in zip(axes[0], quality_metrics):
+        ax.scatter([r[cost] for r in rows], [r[metric] for r in rows], alpha=0.5, label="config")
+
+        front = pareto_front(rows, quality=metric, cost=cost)
+        ax.plot([r[cost] for r in front], [r[metric] for r in front], marker="o", color="tab:red", label="Pareto front")
+        for r in front:
+            ax.annotate(_sweep_label(r), (r[cost], r[metric]), fontsize=7, xytext=(4, -10), textcoords="offset points")
+
+        ax.set_title(f"{metric.upper()} vs {cost_label}")
+        ax.set_xlabel(cost_label)
+        ax.set_ylabel(metric.upper())
+        ax.set_ylim(-0.02, 1.05)
+        ax.grid(True, linestyle="--", linewidth=0.7)
+        ax.legend(loc="lower right")
+
+    plt.tight_layout()
+    _save_or_show(save_path, dpi=dpi, show=show)
+
+
+def print_sweep_summary(rows: list[dict], quality_metric: str = "hit", min_quality: float = 0.8):
+    if not rows:
+        print("No sweep results to summarize.")
+        return
+
+    print("========== Sweep Pareto Front ==========")
+    for r in pareto_front(rows, quality=quality_metric, cost="query_ms_p50"):
+        print(
+            f"- {_sweep_label(r):<45} {quality_metric}={r[quality_metric]:.3f} "
+            f"p50={r['query_ms_p50']:.1f}ms context={r['context_chars']:.0f} chars "
+            f"index~{r['index_mb_est']:.1f}MB ingest={r['ingest_s']:.1f}s"
+        )
+
+    passing = [r for r in rows if r[quality_metric] >= min_quality]
+    print("----------------------------------------")
+    if not passing:
+        print(f"No configuration reaches {quality_metric} >= {min_quality}")
+    else:
+        cheapest = min(passing, key=lambda r: (r["query_ms_p50"], r["context_chars"], r["index_mb_est"]))
+        print(f"Cheapest with {quality_metric} >= {min_quality}: {_sweep_label(cheapest)}")
+    print("========================================")
+
+
+def generate_sweep_report(
+        rows: list[dict],
+        out_dir: str = "plots/sweep",
+        min_quality: float = 0.8,
+        quality_metric: str = "hit",
+        dpi: int = 200,
+        show: bool = False,
+):
+    out_dir = get_abs_path(out_dir)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    print_sweep_summary(rows, quality_metric=quality_metric, min_quality=min_quality)
+
+    plot_sweep_pareto(
+        rows,
+        cost="query_ms_p50",
+        cost_label="Query latency p50 (ms)",
+        save_path=f"{out_dir}/01_pareto_latency.png",
+        dpi=dpi,
+        show=show,
+    )
+
+    plot_sweep_pareto(
+        rows,
+        cost="context_chars",
+        cost_label="Context size per prompt (chars)",
+        save_path=f"{out_dir}/02_pareto_context.png",
+        dpi=dpi,
+        show=show,
+    )
+
+    plot_sweep_pareto(
+        rows,
+        cost="index_mb_est",
+        cost_label="Estimated index size (MB, vectors + text)",
+        save_path=f"{out_dir}/03_pareto_storage_estimate.png",
+        dpi=dpi,
+        show=show,
+    )
+
+    print(f"\n✅ Sweep report saved under folder: {out_dir}")
+
+
+# ---------------------------
+# Large-scale report engine
+# ---------------------------
+# Aggregates are computed once with numpy in the calling process; each chart is a
+# module-level render task so it can run in a worker process on the Agg backend.
+LARGE_RUN_THRESHOLD = 1000
+SCORE_BINS = np.linspace(0.0, 1.0, 11)
+
+
+def _metric_arrays(results: list[dict]) -> dict:
+    def col(name: str) -> np.ndarray:
+        return np.fromiter((float(r.get("metrics", {}).get(name, 0.0)) for r in results), dtype=np.float64, count=len(results))
+
+    ids = [r.get("id", "") or "??????" for r in results]
+    return {
+        "hit": col("hit"),
+        "mrr": col("mrr"),
+        "ndcg": col("ndcg"),
+        "keyword_coverage": col("keyword_coverage"),
+        "retrieved_count": col("retrieved_count"),
+        "relevant_count": col("relevant_count"),
+        "labels": [f"{i[:6]} | {_short(r.get('question', ''), 80)}" for i, r in zip(ids, results)],
+        "short_ids": [i[:6] for i in ids],
+        "questions": [r.get("question", "") for r in results],
+    }
+
+
+def _print_summary_arrays(a: dict):
+    total = len(a["hit"])
+    if total == 0:
+        print("No results to summarize.")
+        return
+
+    fails = np.flatnonzero(a["hit"] == 0.0)
+    print("========== Retrieval Summary ==========")
+    print(f"Total Questions        : {total}")
+    print(f"Hit@K rate             : {a['hit'].mean():.3f}")
+    print(f"Avg MRR                : {a['mrr'].mean():.3f}")
+    print(f"Avg NDCG               : {a['ndcg'].mean():.3f}")
+    print(f"Avg keyword coverage   : {a['keyword_coverage'].mean():.1f}%")
+    print("--------------------------------------")
+    print(f"Hit=0 count            : {len(fails)}")
+    print(f"MRR < 0.33             : {(a['mrr'] < 0.33).mean() * 100:.1f}%")
+    print(f"MRR < 0.20             : {(a['mrr'] < 0.20).mean() * 100:.1f}%")
+    print(f"NDCG < 0.50            : {(a['ndcg'] < 0.50).mean() * 100:.1f}%")
+    print("======================================")
+
+    if len(fails) > 0:
+        print("\nHit=0 Questions (first 20):")
+        for i in fails[:20]:
+            print(f"- {a['short_ids'][i]} | {a['questions'][i]}")
+
+
+def _init_render_worker():
+    plt.switch_backend("Agg")
+
+
+def _render_scatter(path: str, mrr: np.ndarray, ndcg: np.ndarray, large: bool, dpi: int):
+    plt.figure(figsize=(7, 6))
+    if large:
+        # MRR takes few distinct values (1, 1/2, 1/3, ...); a density view stays readable
+        plt.hexbin(mrr, ndcg, gridsize=30, extent=(0.0, 1.0, 0.0, 1.0), mincnt=1, cmap="viridis")
+        plt.colorbar(label="Questions")
+        plt.title(f"NDCG vs MRR (density, {len(mrr)} questions)")
+    else:
+        plt.scatter(mrr, ndcg, alpha=0.7)
+        plt.title("NDCG vs MRR (no labels)")
+    plt.xlabel("MRR")
+    plt.ylabel("NDCG")
+    plt.xlim(-0.02, 1.05)
+    plt.ylim(-0.02, 1.05)
+    plt.grid(True, linestyle="--", linewidth=0.7)
+    plt.tight_layout()
+    _save_or_show(path, dpi=dpi, show=False)
+
+
+def _render_histograms(path: str, series: dict[str, np.ndarray], dpi: int):
+    plt.figure(figsize=(12, 5))
+    for label, values in series.items():
+        counts, edges = np.histogram(values, bins=SCORE_BINS)
+        plt.stairs(counts, edges, fill=True, alpha=0.45, label=label)
+    plt.title("Metric Distributions")
+    plt.xlabel("Score")
+    plt.ylabel("Count")
+    plt.xlim(0.0, 1.05)
+    plt.grid(True, linestyle="--", linewidth=0.7)
+    plt.legend()
+    plt.tight_layout()
+    _save_or_show(path, dpi=dpi, show=False)
+
+
+def _render_barh(path: str, labels: list[str], values: np.ndarray, title: str, xlabel: str, dpi: int):
+    y = np.arange(len(labels))
+    plt.figure(figsize=(14, max(4, 0.42 * len(labels))))
+    plt.barh(y, values)
+    plt.yticks(y, labels)
+    plt.xlim(0.0, 1.05)
+    plt.xlabel(xlabel)
+    plt.title(title)
+    plt.grid(True, axis="x", linestyle="--", linewidth=0.7)
+    plt.tight_layout()
+    _save_or_show(path, dpi=dpi, show=False)
+
+
+def _render_binned(path: str, series: dict[str, np.ndarray], dpi: int):
+    """Share of questions per score decile, one group of bars per metric."""
+    total = max(len(next(iter(series.values()))), 1)
+    centers = (SCORE_BINS[:-1] + SCORE_BINS[1:]) / 2
+    width = 0.1 / (len(series) + 1)
+
+    plt.figure(figsize=(12, 5))
+    for i, (label, values) in enumerate(series.items()):
+        counts, _ = np.histogram(values, bins=SCORE_BINS)
+        plt.bar(centers + (i - (len(series) - 1) / 2) * width, counts / total * 100, width=width, label=label)
+    plt.xticks(SCORE_BINS)
+    plt.xlabel("Score bin")
+    plt.ylabel("% of questions")
+    plt.title(f"Score deciles ({total} questions)")
+    plt.grid(True, axis="y", linestyle="--", linewidth=0.7)
+    plt.legend()
+    plt.tight_layout()
+    _save_or_show(path, dpi=dpi, show=False)
+
+
+def _worst_best(a: dict, metric: str, n: int) -> tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(a[metric], kind="stable")
+    return order[:n], order[-n:]
+
+
+def _render_tasks(a: dict, out_dir: str, n: int, dpi: int, max_failures: int) -> list[tuple]:
+    large = len(a["hit"]) > LARGE_RUN_THRESHOLD
+    series = {
+        "Hit@K": a["hit"],
+        "MRR": a["mrr"],
+        "NDCG": a["ndcg"],
+        "Keyword Coverage (scaled)": a["keyword_coverage"] / 100.0,
+    }
+    tasks = [
+        (_render_scatter, f"{out_dir}/01_scatter_mrr_ndcg.png", a["mrr"], a["ndcg"], large, dpi),
+        (_render_histograms, f"{out_dir}/02_histograms.png", series, dpi),
+    ]
+
+    for metric, worst_no, best_no in (("mrr", "03", "04"), ("ndcg", "05", "06")):
+        worst, best = _worst_best(a, metric, n)
+        for idx, no, kind in ((worst, worst_no, "worst"), (best, best_no, "best")):
+            tasks.append((
+                _render_barh,
+                f"{out_dir}/{no}_{kind}_{n}_{metric}.png",
+                [a["labels"][i] for i in idx],
+                a[metric][idx],
+                f"{kind.capitalize()} {len(idx)} by {metric.upper()}",
+                metric.upper(),
+                dpi,
+            ))
+
+    fails = np.flatnonzero(a["hit"] == 0.0)
+    # lowest keyword coverage first: the most clearly missed questions
+    shown = fails[np.argsort(a["keyword_coverage"][fails], kind="stable")][:max_failures]
+    tasks.append((
+        _render_barh,
+        f"{out_dir}/07_hit0_failures.png",
+        [a["labels"][i] for i in shown],
+        a["keyword_coverage"][shown] / 100.0,
+        f"Hit=0 Failures (showing {len(shown)} of {len(fails)})" if len(fails) else "Hit=0 Failures (none)",
+        "Keyword coverage (scaled)",
+        dpi,
+    ))
+
+    if large:
+        tasks.append((_render_binned, f"{out_dir}/08_score_deciles.png", series, dpi))
+    return tasks
+
+
+def _write_failures(a: dict, path: str):
+    fails = np.flatnonzero(a["hit"] == 0.0)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in fails:
+            f.write(f"{a['short_ids'][i]}\t{a['keyword_coverage'][i]:.1f}\t{a['questions'][i]}\n")
+    print(f"Saved: {path} ({len(fails)} hit=0 questions)")
+
+
+def write_html_report(a: dict, path: str, n: int = 25):
+    """Single self-contained interactive HTML report (plotly.js is inlined)."""
+    import plotly.graph_objects as go
+
+    figures = []
+    scatter = go.Scattergl if len(a["hit"]) > LARGE_RUN_THRESHOLD else go.Scatter
+    fig = go.Figure(scatter(
+        x=a["mrr"], y=a["ndcg"], mode="markers", marker={"opacity": 0.6},
+        text=a["labels"], hovertemplate="%{text}<br>MRR=%{x:.3f} NDCG=%{y:.3f}<extra></extra>",
+    ))
+    fig.update_layout(title="NDCG vs MRR", xaxis_title="MRR", yaxis_title="NDCG")
+    figures.append(fig)
+
+    fig = go.Figure()
+    for label, key, scale in (("Hit@K", "hit", 1.0), ("MRR", "mrr", 1.0), ("NDCG", "ndcg", 1.0), ("Keyword Coverage (scaled)", "keyword_coverage", 100.0)):
+        fig.add_histogram(x=a[key] / scale, name=label, opacity=0.6, xbins={"start": 0.0, "end": 1.0001, "size": 0.1})
+    fig.update_layout(title="Metric Distributions", barmode="overlay", xaxis_title="Score", yaxis_title="Count")
+    figures.append(fig)
+
+    worst, _ = _worst_best(a, "ndcg", n)
+    fig = go.Figure(go.Table(
+        header={"values": ["id", "question", "hit", "mrr", "ndcg", "kw coverage"]},
+        cells={"values": [
+            [a["short_ids"][i] for i in worst],
+            [a["questions"][i] for i in worst],
+            np.round(a["hit"][worst], 3),
+            np.round(a["mrr"][worst], 3),
+            np.round(a["ndcg"][worst], 3),
+            np.round(a["keyword_coverage"][worst], 1),
+        ]},
+    ))
+    fig.update_layout(title=f"Worst {len(worst)} by NDCG")
+    figures.append(fig)
+
+    body = "\n".join(
+        fig.to_html(full_html=False, include_plotlyjs=(i == 0)) for i, fig in enumerate(figures)
+    )
+    Path(path).write_text(
+        f"<html><head><meta charset='utf-8'><title>Retrieval report</title></head><body>{body}</body></html>",
+        encoding="utf-8",
+    )
+    print(f"Saved: {path}")
+
+
+def _render_serial(tasks: list[tuple]):
+    backend = plt.get_backend()
+    _init_render_worker()
+    try:
+        for func, *args in tasks:
+            func(*args)
+    finally:
+        plt.switch_backend(backend)
+
+
+def _render_parallel(tasks: list[tuple], workers: int) -> list[tuple]:
+    """Renders in a process pool; returns the tasks left undone if the pool broke."""
+    done = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as pool:
+            futures = [pool.submit(func, *args) for func, *args in tasks]
+            for i, future in enumerate(futures):
+                future.result()
+                done.add(i)
+    except BrokenProcessPool as e:
+        # e.g. spawn/forkserver workers re-importing a caller script without a __main__ guard
+        print(f"Render pool failed ({e}); rendering the remaining charts in this process")
+    return [task for i, task in enumerate(tasks) if i not in done]
+
+
+def render_retrieval_report(
+        results: list[dict],
+        out_dir: str = "plots",
+        n: int = 25,
+        dpi: int = 200,
+        workers: int = 0,
+        max_failures: int = 40,
+        html: bool = False,
+):
+    """
+    Same charts as the serial report, without interactive windows. Rendering runs in
+    this process by default; `workers` > 0 (or None = one per CPU) opts into a process
+    pool, which needs the caller's script to have an `if __name__ == "__main__"` guard
+    under the spawn/forkserver start methods (falls back to in-process if the pool breaks).
+    Runs above LARGE_RUN_THRESHOLD questions get a density scatter and a score-decile
+    chart; hit=0 questions are listed in full in hit0_failures.tsv rather than plotted
+    one bar each.
+    """
+    out_dir = str(get_abs_path(out_dir))
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    a = _metric_arrays(results)
+    _print_summary_arrays(a)
+    if len(a["hit"]) == 0:
+        return
+
+    tasks = _render_tasks(a, out_dir, n, dpi, max_failures)
+    workers = min(os.cpu_count() or 1, len(tasks)) if workers is None else workers
+    if workers > 0:
+        tasks = _render_parallel(tasks, workers)
+    if tasks:
+        _render_serial(tasks)
+
+    _write_failures(a, f"{out_dir}/hit0_failures.tsv")
+    if html:
+        write_html_report(a, f"{out_dir}/report.html", n=n)
+
+
 # ---------------------------
 # One-shot report generator
 # ---------------------------
@@ -252,7 +663,15 @@ def generate_retrieval_report(
         n: int = 25,
         dpi: int = 200,
         show: bool = False,
+        workers: int = 0,
+        html: bool = False,
 ):
+    if not show:
+        # nothing to display interactively: use the batch renderer
+        render_retrieval_report(results, out_dir=out_dir, n=n, dpi=dpi, workers=workers, html=html)
+        print(f"\n✅ Report saved under folder: {get_abs_path(out_dir)}")
+        return
+
     out_dir = get_abs_path(out_dir)
     Path(out_dir).mkdir(parents=True, exist_ok=True)
 
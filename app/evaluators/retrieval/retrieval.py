@@ -26,6 +26,12 @@ class RetrievalMetrics(BaseModel):
     debug: Optional[Dict[str, Any]] = None
 
 
+def average_metrics(metrics: List[RetrievalMetrics], fields: tuple = ("hit", "mrr", "ndcg")) -> Dict[str, float]:
+    """Mean of each metric field over a batch of questions (0.0 for an empty batch)."""
+    total = max(len(metrics), 1)
+    return {f: sum(getattr(m, f) for m in metrics) / total for f in fields}
+
+
 class RetrievalEvaluator:
     # too generic (but we still allow them to exist; we just won't count them strongly)
     GENERIC_KEYWORDS = {
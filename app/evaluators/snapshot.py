@@ -0,0 +1,135 @@
+import gzip
+import json
+import time
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from app.config import settings
+from app.evaluators.retrieval.retrieval import TestQuestion, RetrievalEvaluator
+from app.store.chunk_file import chunk_id
+from app.store.cutoff import adaptive_cutoff
+from app.utils import load_jsonl, get_abs_path
+
+# Snapshot layout (gzip JSONL):
+#   {"type": "header", "collection": ..., "embedding_model": ..., "k": ..., ...}
+#   {"type": "chunk", "id": ..., "text": ..., "metadata": {...}}          once per distinct chunk
+#   {"type": "question", "question": {TestQuestion}, "hits": [[chunk_id, score], ...]}
+
+
+def default_snapshot_path(collection_name: str) -> str:
+    return f"snapshots/retrieval-{collection_name}.jsonl.gz"
+
+
+def record_retrieval_snapshot(
+        vs,
+        out_path: str | None = None,
+        k: int | None = None,
+        queries_path: str = "app/queries/queries.jsonl",
+) -> Path:
+    """
+    Queries the store once per test question and saves the top-k chunk ids, similarity
+    scores and texts, tagged with the collection the store was serving at the time.
+    """
+    k = k or settings.CHUNK_RETRIVAL_SIZE
+    questions = [TestQuestion.model_validate(q) for q in load_jsonl(queries_path)]
+    collection = getattr(vs, "collection_name", None) or "in-memory"
+    out_path = get_abs_path(out_path or default_snapshot_path(collection))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    header = {
+        "type": "header",
+        "collection": collection,
+        "store": type(vs).__name__,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "embedding_backend": settings.EMBEDDING_BACKEND,
+        "k": k,
+        "questions": len(questions),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    seen: set[str] = set()
+    start = time.perf_counter()
+    with gzip.open(out_path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for i, q in enumerate(questions, 1):
+            results = vs.get_with_scores(q.question, k=k)
+            hits = []
+            for doc, score in results:
+                key = chunk_id(doc)
+                if key not in seen:
+                    seen.add(key)
+                    record = {"type": "chunk", "id": key, "text": doc.page_content, "metadata": doc.metadata}
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                hits.append([key, round(float(score), 6)])
+            f.write(json.dumps({"type": "question", "question": q.model_dump(), "hits": hits}, ensure_ascii=False) + "\n")
+            if i % 25 == 0 or i == len(questions):
+                print(f"Recorded {i} / {len(questions)} questions")
+
+    print(f"Snapshot: {out_path} ({len(questions)} questions, {len(seen)} distinct chunks, "
+          f"{out_path.stat().st_size / 1024:.1f} KB, {time.perf_counter() - start:.1f}s)")
+    return out_path
+
+
+def load_retrieval_snapshot(path: str) -> tuple[dict, list[tuple[TestQuestion, list[tuple[Document, float]]]]]:
+    """Returns the header and, per question, the recorded (document, score) pairs in rank order."""
+    header: dict = {}
+    chunks: dict[str, Document] = {}
+    rows = []
+    with gzip.open(get_abs_path(path), "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record.get("type")
+            if kind == "header":
+                header = record
+            elif kind == "chunk":
+                chunks[record["id"]] = Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+            elif kind == "question":
+                hits = [(chunks[chunk_id], score) for chunk_id, score in record["hits"]]
+                rows.append((TestQuestion.model_validate(record["question"]), hits))
+    return header, rows
+
+
+def replay_retrieval_snapshot(
+        path: str,
+        evaluator: RetrievalEvaluator | None = None,
+        k: int | None = None,
+        adaptive_k: bool | None = None,
+        queries_path: str | None = None,
+        out_dir: str | None = "plots/retrieval",
+        show: bool = False,
+) -> list[dict]:
+    """
+    Re-scores a recorded snapshot without the embedding model or the database.
+
+    k truncates the recorded top-k (default: the recorded k), adaptive_k applies adaptive_cutoff to the recorded
+    scores (defaults to RETRIEVAL_ADAPTIVE_K), queries_path re-reads the test questions
+    by id so edited keywords are picked up. out_dir=None skips the plots.
+    """
+    header, rows = load_retrieval_snapshot(path)
+    print(f"Replaying snapshot of '{header.get('collection')}' "
+          f"({header.get('embedding_model')}, k={header.get('k')}, recorded {header.get('created_at')})")
+
+    evaluator = evaluator or RetrievalEvaluator(min_keyword_hits=2)
+    adaptive_k = settings.RETRIEVAL_ADAPTIVE_K if adaptive_k is None else adaptive_k
+    # the recorded k, so adaptive_cutoff does not fall back to CHUNK_RETRIVAL_SIZE
+    k = k or header.get("k")
+    latest = {}
+    if queries_path:
+        latest = {q["id"]: TestQuestion.model_validate(q) for q in load_jsonl(queries_path)}
+
+    results = []
+    for question, hits in rows:
+        question = latest.get(question.id, question)
+        hits = hits[:k] if k else hits
+        documents = adaptive_cutoff(hits, max_k=k) if adaptive_k else [doc for doc, _ in hits]
+        metrics = evaluator.evaluate(question, documents)
+        results.append({
+            "id": question.id,
+            "question": question.question,
+            "metrics": metrics.model_dump(),
+        })
+
+    if out_dir:
+        from app.evaluators.retrieval.plot import generate_retrieval_report
+        generate_retrieval_report(results, out_dir=out_dir, show=show)
+    return results
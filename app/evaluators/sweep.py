@@ -0,0 +1,103 @@
+import itertools
+import time
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.embeddings import build_embeddings
+from app.evaluators.retrieval.retrieval import TestQuestion, RetrievalEvaluator, average_metrics
+from app.ingestion.chunker import DocumentChunker
+from app.store.memory_vector import InMemoryStore
+from app.utils import load_jsonl, get_abs_path
+from app.utils.file import write_list_to_jsonl
+
+
+def _estimated_index_bytes(chunks, dims: int) -> int:
+    # float32 vectors + raw chunk text, i.e. what a vector store has to hold at minimum
+    # (no ANN graph, metadata or storage overhead): an estimate, not a measurement
+    return len(chunks) * dims * 4 + sum(len(c.page_content.encode("utf-8")) for c in chunks)
+
+
+def run_config_sweep(
+        models: tuple[str, ...] = ("all-MiniLM-L6-v2",),
+        chunk_sizes: tuple[int, ...] = (500, 1000, 1500),
+        chunk_overlaps: tuple[int, ...] = (100, 200),
+        ks: tuple[int, ...] = (3, 5, 10),
+        max_questions: int | None = None,
+        out_path: str = "plots/sweep/sweep.jsonl",
+) -> list[dict]:
+    """
+    Builds an isolated in-memory index for every (model, chunk_size, chunk_overlap)
+    combination and evaluates it with RetrievalEvaluator for every k.
+    Each result row holds quality (hit/mrr/ndcg) and cost (ingest time, estimated
+    index size, query latency and context size at that k) so the grid can be
+    compared on a Pareto chart.
+    """
+    rows = load_jsonl("app/queries/queries.jsonl")
+    questions = [TestQuestion.model_validate(r) for r in rows[:max_questions]]
+    documents = DocumentChunker.load_documents()
+    evaluator = RetrievalEvaluator(min_keyword_hits=2)
+
+    results = []
+    for model in models:
+        embeddings = build_embeddings(model_name=model)
+
+        # query vectors only depend on the model; embed them once per model
+        query_vectors = []
+        embed_ms = []
+        for q in questions:
+            start = time.perf_counter()
+            query_vectors.append(embeddings.embed_query(q.question))
+            embed_ms.append((time.perf_counter() - start) * 1000.0)
+        dims = len(query_vectors[0]) if query_vectors else 0
+
+        for chunk_size, chunk_overlap in itertools.product(chunk_sizes, chunk_overlaps):
+            if chunk_overlap >= chunk_size:
+                continue
+            print(f"========== {model} | chunk_size={chunk_size} overlap={chunk_overlap} ==========")
+            splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            chunks = splitter.split_documents(documents)
+
+            store = InMemoryStore(embeddings=embeddings, k=max(ks))
+            start = time.perf_counter()
+            store.add(chunks)
+            ingest_s = time.perf_counter() - start
+
+            for k in ks:
+                # searched (and timed) separately per k: larger k costs more to search and to send
+                retrieved = []
+                search_ms = []
+                for vector in query_vectors:
+                    start = time.perf_counter()
+                    retrieved.append(store.store.similarity_search_by_vector(vector, k=k))
+                    search_ms.append((time.perf_counter() - start) * 1000.0)
+                latency_ms = np.array(embed_ms) + np.array(search_ms)
+
+                metrics = [evaluator.evaluate(q, docs) for q, docs in zip(questions, retrieved)]
+                results.append({
+                    "model": model,
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "k": k,
+                    "chunks": len(chunks),
+                    "ingest_s": ingest_s,
+                    "index_mb_est": _estimated_index_bytes(chunks, dims) / (1024 * 1024),
+                    "query_ms_p50": float(np.percentile(latency_ms, 50)) if len(latency_ms) else 0.0,
+                    "query_ms_p95": float(np.percentile(latency_ms, 95)) if len(latency_ms) else 0.0,
+                    # every retrieved chunk ends up in the prompt
+                    "context_chars": float(np.mean([sum(len(d.page_content) for d in docs) for docs in retrieved])) if retrieved else 0.0,
+                    **average_metrics(metrics),
+                })
+
+            store.delete()
+
+    write_list_to_jsonl(results, get_abs_path(out_path))
+    print(f"Saved: {get_abs_path(out_path)}")
+    return results
+
+
+def evaluate_config_sweep(min_quality: float = 0.8, quality_metric: str = "hit", **kwargs):
+    results = run_config_sweep(**kwargs)
+    from app.evaluators.retrieval.plot import generate_sweep_report
+    generate_sweep_report(results, out_dir="plots/sweep", min_quality=min_quality, quality_metric=quality_metric)
+    return results
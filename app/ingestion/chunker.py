@@ -8,27 +8,36 @@ from app.utils.file import get_abs_path
 
 class DocumentChunker:
 
-    def __init__(self, splitter):
+    def __init__(self, splitter, deduplicator=None):
         self.splitter = splitter
+        self.deduplicator = deduplicator
 
     def doc_to_chunks(self, only_meta: bool = False):
+        documents = self.load_documents()
+        metadata_all = []
+        if only_meta:
+            return metadata_all
+
+        chunks = self.splitter.split_documents(documents)
+        if self.deduplicator is not None:
+            chunks = self.deduplicator.deduplicate(chunks)
+        return chunks
+
+    @staticmethod
+    def load_documents():
         knowledge_base_path = get_abs_path(settings.MD_DOCS_PATH)
         files = sorted(knowledge_base_path.rglob("*.md"))
         def is_version(s: str) -> bool:
             return bool(re.search(r"\b\d+\.\d+(?:\.\d+)?\b", s))
 
         documents = []
-        metadata_all = []
         for file in files:
             if is_version(str(file.absolute())) or "release-notes" in str(file.absolute()):
                 continue
             docs = TextLoader(str(file), encoding="utf-8").load()
 
             documents.extend(docs)
-        if only_meta:
-            return metadata_all
-
-        return self.splitter.split_documents(documents)
+        return documents
 
 
     @staticmethod
@@ -0,0 +1,122 @@
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from app.config import settings
+from app.utils.text import tokens
+
+_MERSENNE_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+class ChunkDeduplicator:
+    """
+    Near-duplicate chunk elimination with MinHash + LSH banding.
+
+    Chunks whose estimated Jaccard similarity (over word shingles) reaches
+    `threshold` are clustered; each cluster keeps one representative (the
+    longest chunk) whose metadata records the dropped aliases: their sources and
+    their positions as "<source>#<n>" (n-th chunk of that source before dedup), so
+    duplicates from the kept chunk's own source are traceable too.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 13):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**31, size=num_perm, dtype=np.uint64)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        toks = tokens(text)
+        n = self.shingle_size
+        if len(toks) <= n:
+            shingles = {" ".join(toks)}
+        else:
+            shingles = {" ".join(toks[i : i + n]) for i in range(len(toks) - n + 1)}
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text: str) -> np.ndarray:
+        h = self._shingle_hashes(text)
+        # (a*h + b) mod p for every permutation/shingle pair, min over shingles
+        perm = (np.outer(h, self._a) + self._b) % _MERSENNE_PRIME
+        return (perm & _MAX_HASH).min(axis=0)
+
+    def _clusters(self, signatures: np.ndarray) -> list[list[int]]:
+        parent = list(range(len(signatures)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            band_sig = signatures[:, band * self.rows : (band + 1) * self.rows]
+            for i, row in enumerate(band_sig):
+                buckets[row.tobytes()].append(i)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                # verify against the bucket head only; keeps huge buckets linear
+                head = members[0]
+                for other in members[1:]:
+                    if np.mean(signatures[head] == signatures[other]) >= self.threshold:
+                        ra, rb = find(head), find(other)
+                        if ra != rb:
+                            parent[rb] = ra
+
+        groups = defaultdict(list)
+        for i in range(len(signatures)):
+            groups[find(i)].append(i)
+        return list(groups.values())
+
+    def deduplicate(self, chunks):
+        if not chunks:
+            return chunks
+
+        signatures = np.stack([self.signature(c.page_content or "") for c in chunks])
+        clusters = self._clusters(signatures)
+
+        positions, seen = [], defaultdict(int)
+        for c in chunks:
+            source = c.metadata.get("source")
+            positions.append(f"{source}#{seen[source]}")
+            seen[source] += 1
+
+        kept = []
+        for members in clusters:
+            rep = max(members, key=lambda i: (len(chunks[i].page_content or ""), -i))
+            chunk = chunks[rep]
+            aliases = [chunks[i] for i in members if i != rep]
+            if aliases:
+                sources = {a.metadata.get("source") for a in aliases} - {chunk.metadata.get("source"), None}
+                chunk.metadata["duplicate_count"] = len(aliases)
+                chunk.metadata["duplicate_sources"] = sorted(sources)
+                chunk.metadata["duplicate_positions"] = [positions[i] for i in sorted(members) if i != rep]
+            kept.append((rep, chunk))
+
+        kept.sort(key=lambda x: x[0])
+        dropped = len(chunks) - len(kept)
+        print(
+            f"Deduplicated chunks: kept {len(kept)} / {len(chunks)} "
+            f"(dropped {dropped}, {sum(1 for m in clusters if len(m) > 1)} near-duplicate clusters)"
+        )
+        return [chunk for _, chunk in kept]
+
+
+def get_deduplicator() -> ChunkDeduplicator | None:
+    if not settings.DEDUP_ENABLED:
+        return None
+    return ChunkDeduplicator(
+        threshold=settings.DEDUP_THRESHOLD,
+        num_perm=settings.DEDUP_NUM_PERM,
+        bands=settings.DEDUP_BANDS,
+    )
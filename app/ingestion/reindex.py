@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.config import settings
+from app.embeddings import get_embeddings
+from app.evaluators.retrieval.retrieval import TestQuestion, RetrievalEvaluator
+from app.ingestion.chunker import DocumentChunker
+from app.ingestion.dedup import get_deduplicator
+from app.store.pg_vector import PGVectorStore
+from app.utils import load_jsonl
+
+
+def new_version_name() -> str:
+    return f"{settings.COLLECTION_NAME}-v{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def smoke_evaluate(vs, n: int) -> float:
+    """Hit rate of the first n evaluation questions against the given store."""
+    rows = load_jsonl("app/queries/queries.jsonl")[:n]
+    evaluator = RetrievalEvaluator(min_keyword_hits=2)
+    hits = 0.0
+    for row in rows:
+        test_question = TestQuestion.model_validate(row)
+        hits += evaluator.evaluate(test_question, vs.get(test_question.question)).hit
+    return hits / len(rows) if rows else 0.0
+
+
+@contextmanager
+def _limit_cpu_threads(n: int):
+    """Caps torch's intra-op threads while re-indexing and restores the previous value afterwards."""
+    if n <= 0:
+        yield
+        return
+    import torch
+    previous = torch.get_num_threads()
+    torch.set_num_threads(n)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+def rebuild_collection(store_cls=PGVectorStore, embeddings=None, gc_grace_seconds: float | None = None) -> str:
+    """
+    Blue/green re-index:
+    1. ingest into a new versioned collection (throttled batches, limited torch threads)
+    2. validate it with a smoke evaluation
+    3. atomically point the COLLECTION_NAME alias at it
+    4. after a grace period (serving stores re-resolve the alias), drop old versions
+       except the REINDEX_KEEP_VERSIONS most recent ones
+    Returns the new version name.
+    """
+    embeddings = embeddings or get_embeddings()
+    version = new_version_name()
+    print(f"Re-indexing into new collection: {version}")
+
+    with _limit_cpu_threads(settings.REINDEX_EMBEDDING_THREADS):
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        chunks = DocumentChunker(splitter=splitter, deduplicator=get_deduplicator()).doc_to_chunks()
+        vs = store_cls(embeddings=embeddings, collection_name=version)
+        vs.add(chunks, batch_size=settings.REINDEX_BATCH_SIZE, throttle_seconds=settings.REINDEX_THROTTLE_SECONDS)
+        hit_rate = smoke_evaluate(vs, settings.REINDEX_SMOKE_QUESTIONS)
+
+    print(f"Smoke evaluation hit rate: {hit_rate:.3f} (min {settings.REINDEX_MIN_HIT_RATE:.3f})")
+    if hit_rate < settings.REINDEX_MIN_HIT_RATE:
+        vs.delete()
+        raise RuntimeError(f"New collection {version} failed smoke evaluation (hit rate {hit_rate:.3f}); not promoted")
+
+    previous = vs.promote()
+    print(f"Alias '{settings.COLLECTION_NAME}' now points at {version} (was {previous})")
+
+    if gc_grace_seconds is None:
+        gc_grace_seconds = settings.COLLECTION_ALIAS_REFRESH_SECONDS * 2
+    if gc_grace_seconds > 0:
+        print(f"Waiting {gc_grace_seconds:.0f}s before dropping old versions...")
+        time.sleep(gc_grace_seconds)
+    garbage_collect_versions(store_cls, embeddings, current=version)
+    return version
+
+
+def garbage_collect_versions(store_cls, embeddings, current: str):
+    old = [v for v in store_cls.list_versions() if v != current]
+    keep = set(old[-settings.REINDEX_KEEP_VERSIONS:]) if settings.REINDEX_KEEP_VERSIONS > 0 else set()
+    for name in old:
+        if name in keep:
+            print(f"Keeping previous version for rollback: {name}")
+            continue
+        print(f"Dropping old version: {name}")
+        store_cls(embeddings=embeddings, collection_name=name).delete()
@@ -1,10 +1,16 @@
+import os
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pygments.styles import vs
 import gradio as gr
 
 from app.config import settings
 from app.ingestion.chunker import DocumentChunker
+from app.ingestion.dedup import get_deduplicator
+from app.ingestion.reindex import rebuild_collection
 from app.utils import get_project_root
+from app.utils.admission import admission, Overloaded
+from app.utils.metrics import metrics
 from scripts.initialize import download_redis_docs
 from app.embeddings import get_embeddings
 from app.store.pg_vector import PGVectorStore
@@ -23,20 +29,63 @@ def initialize_vector_database(by_reset: bool = False):
     if marker_file.exists() and not by_reset:
         print("Vector DB already initialized. Skipping.")
         return
-    vs = PGVectorStore(embeddings=get_embeddings())
     if by_reset:
-        print("Deleting existing vectorstore...")
-        vs.delete()
+        print("Rebuilding vectorstore into a new version...")
+        rebuild_collection(PGVectorStore)
+        marker_file.write_text("ok")
+        return
 
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunker = DocumentChunker(splitter=splitter)
+    chunker = DocumentChunker(splitter=splitter, deduplicator=get_deduplicator())
     chunks = chunker.doc_to_chunks()
     vs = PGVectorStore(embeddings=get_embeddings())
     vs.add(chunks)
     print(f"Vector database initialization complete - chunks added: {len(chunks)}")
     marker_file.write_text("ok")
 
-def initialize_gradio_app(chat_func, title: str = "Chat with RedisAI", inbrowser: bool = True):
+RATE_LIMITED_MESSAGE = "You're sending messages a little too fast. Please wait a few seconds and try again."
+OVERLOADED_MESSAGE = "Redis Expert is handling a lot of questions right now. Please try again in a moment."
+
+
+def _queue_depth(demo: gr.Blocks) -> int:
+    # Gradio has no public accessor for the number of events waiting in its queue
+    queue = getattr(demo, "_queue", None)
+    return len(queue) if queue is not None else 0
+
+
+def with_admission_control(chat_func, queue_depth=None):
+    """
+    Per-session rate limiting and a friendly answer instead of a timeout when a stage is overloaded.
+    With `queue_depth`, requests that come off a Gradio queue longer than GRADIO_QUEUE_MAX_SIZE
+    are answered right away with the same message, so the backlog drains before Gradio's
+    own (hard) bound would reject new requests with its bare "Queue is full" error.
+    """
+    def chat_with_admission(message, history, request: gr.Request):
+        if queue_depth is not None:
+            depth = queue_depth()
+            metrics.gauge("gradio.queue_depth", depth)
+            metrics.observe("gradio.queue_depth_at_start", depth)
+            if 0 < settings.GRADIO_QUEUE_MAX_SIZE <= depth:
+                metrics.incr("admission.queue.rejected")
+                return OVERLOADED_MESSAGE
+        session_id = request.session_hash if request is not None else None
+        if not admission.allow_session(session_id):
+            return RATE_LIMITED_MESSAGE
+        metrics.incr("admission.requests")
+        try:
+            return chat_func(message, history)
+        except Overloaded:
+            return OVERLOADED_MESSAGE
+    return chat_with_admission
+
+
+def initialize_gradio_app(
+        chat_func,
+        title: str = "Chat with RedisAI",
+        inbrowser: bool = True,
+        server_name: str | None = None,
+        server_port: int | None = None,
+):
     CSS = """
 #chatbot {
   height: 75vh !important;
@@ -46,12 +95,30 @@ def initialize_gradio_app(chat_func, title: str = "Chat with RedisAI", inbrowser
     with gr.Blocks(css=CSS) as demo:
         gr.Markdown(f"# {title}")
         gr.ChatInterface(
-            fn=chat_func,
+            fn=with_admission_control(chat_func, queue_depth=lambda: _queue_depth(demo)),
             chatbot=gr.Chatbot(elem_id="chatbot"),
+            api_name=getattr(chat_func, "__name__", "chat"),
+        )
+
+        def sample_gauges():
+            metrics.gauge("gradio.queue_depth", _queue_depth(demo))
+
+        def metrics_snapshot() -> dict:
+            """Counters, gauges and latency distributions of this server process."""
+            sample_gauges()
+            return {"pid": os.getpid(), **metrics.snapshot()}
+
+        # off the queue, so it still answers when the queue is backed up
+        gr.api(metrics_snapshot, api_name="metrics", queue=False)
+        # bounded Gradio queue; the per-stage limits in app.utils.admission bound the work behind it
+        demo.queue(
+            default_concurrency_limit=settings.GRADIO_CONCURRENCY_LIMIT,
+            max_size=max(settings.GRADIO_QUEUE_HARD_MAX_SIZE, settings.GRADIO_QUEUE_MAX_SIZE),
         )
+        metrics.start_periodic_log(settings.METRICS_LOG_INTERVAL_SECONDS, before=sample_gauges)
         demo.launch(
-            server_name=settings.GRADIO_SERVER_NAME,
-            server_port=int(settings.GRADIO_SERVER_PORT),
-            inbrowser=True,
+            server_name=server_name or settings.GRADIO_SERVER_NAME,
+            server_port=int(server_port or settings.GRADIO_SERVER_PORT),
+            inbrowser=inbrowser,
         )
     return demo
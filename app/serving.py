@@ -0,0 +1,328 @@
+"""
+Pre-fork serving: the master loads the embedding model once, then forks SERVING_WORKERS
+Gradio workers that share the model pages copy-on-write. A balancer process owns the
+public port and forwards each TCP connection to a worker chosen by client IP, so a
+browser session (queue join + event stream) always lands on the same worker.
+The master supervises: health checks, restarts, rolling restart on SIGHUP.
+The admission and Gradio queue limits are totals: each worker enforces 1/SERVING_WORKERS
+of them (rounded up). Session rate limits stay per session, as sessions are sticky.
+"""
+import asyncio
+import gc
+import math
+import os
+import signal
+import socket
+import threading
+import time
+import urllib.request
+import zlib
+
+from app.chatbot.openai import ChatBot
+from app.config import settings
+from app.embeddings import get_embeddings
+from app.init import initialize_gradio_app
+from app.store.pg_vector import PGVectorStore, reset_engine_after_fork
+from app.utils.admission import admission
+
+# deployment-wide totals; each worker enforces its share
+SHARED_LIMITS = (
+    "ADMISSION_EMBEDDING_CONCURRENCY",
+    "ADMISSION_DB_CONCURRENCY",
+    "ADMISSION_LLM_CONCURRENCY",
+    "GRADIO_CONCURRENCY_LIMIT",
+    "GRADIO_QUEUE_MAX_SIZE",
+    "GRADIO_QUEUE_HARD_MAX_SIZE",
+)
+
+
+def _set_torch_threads(n: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(n)
+
+
+def _take_share_of_limits(workers: int):
+    for name in SHARED_LIMITS:
+        value = getattr(settings, name)
+        if value > 0:
+            setattr(settings, name, max(1, math.ceil(value / workers)))
+    admission.reconfigure()
+
+
+def _exit_with_master(master_pid: int):
+    """Children stop (gracefully) when the master goes away, even if it was SIGKILLed."""
+    def watch():
+        while os.getppid() == master_pid:
+            time.sleep(1.0)
+        os.kill(os.getpid(), signal.SIGTERM)
+    threading.Thread(target=watch, name="master-watch", daemon=True).start()
+
+
+# ----------------------------
+# Balancer (own process)
+# ----------------------------
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except OSError:
+        pass
+
+
+async def _balance(sock: socket.socket, backends: list[int]):
+    async def handle(client_reader, client_writer):
+        ip = (client_writer.get_extra_info("peername") or ("",))[0]
+        start = zlib.crc32(ip.encode()) % len(backends)
+        for i in range(len(backends)):
+            # sticky by client IP; fall through to the next worker while one is down or restarting
+            port = backends[(start + i) % len(backends)]
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+        try:
+            await asyncio.gather(_pipe(client_reader, upstream_writer), _pipe(upstream_reader, client_writer))
+        finally:
+            upstream_writer.close()
+            client_writer.close()
+
+    server = await asyncio.start_server(handle, sock=sock)
+    async with server:
+        await server.serve_forever()
+
+
+def _run_balancer(sock: socket.socket, backends: list[int]):
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(_balance(sock, backends))
+    except KeyboardInterrupt:
+        pass
+
+
+# ----------------------------
+# Master / supervisor
+# ----------------------------
+class PreforkServer:
+    def __init__(self, workers: int | None = None, host: str | None = None, port: int | None = None):
+        self.workers = workers or settings.SERVING_WORKERS
+        self.host = host or settings.GRADIO_SERVER_NAME
+        self.port = int(port or settings.GRADIO_SERVER_PORT)
+        self.worker_ports = [self.port + 1 + i for i in range(self.workers)]
+        self.torch_threads = settings.WORKER_TORCH_THREADS or max(1, (os.cpu_count() or 1) // self.workers)
+        self.embeddings = None
+        self.sock: socket.socket | None = None
+        self.pids: dict[int, int] = {}  # slot -> pid
+        self.started_at: dict[int, float] = {}
+        self.ready: set[int] = set()
+        self.failures: dict[int, int] = {}
+        self.balancer_pid: int | None = None
+        self._stop = False
+        self._rolling = False
+        self._master_pid = os.getpid()
+
+    def run(self):
+        self._load_shared_state()
+        self.sock = socket.create_server((self.host, self.port), backlog=1024)
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        for slot in range(self.workers):
+            self._spawn_worker(slot)
+        self._spawn_balancer()
+        print(f"Master {os.getpid()}: {self.workers} workers on ports {self.worker_ports}, "
+              f"balancer on {self.host}:{self.port} ({self.torch_threads} torch threads per worker)")
+
+        last_check = 0.0
+        while not self._stop:
+            if self._rolling:
+                self._rolling = False
+                self._rolling_restart()
+            self._reap()
+            if time.monotonic() - last_check >= settings.WORKER_HEALTH_INTERVAL_SECONDS:
+                last_check = time.monotonic()
+                for slot in list(self.pids):
+                    self._check_health(slot)
+            time.sleep(0.5)
+        self._shutdown()
+
+    def _load_shared_state(self):
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        if settings.EMBEDDING_BACKEND == "onnx":
+            # onnxruntime starts its thread pool when the session is created; that pool does
+            # not survive a fork, so the (small, quantized) ONNX model is loaded per worker
+            print("ONNX embedding backend: loading the model in each worker")
+            return
+        # a single intra-op thread keeps torch from starting its OpenMP pool before the fork
+        _set_torch_threads(1)
+        self.embeddings = get_embeddings()
+        self.embeddings.embed_documents(["warm up"])
+        # move everything allocated so far out of the GC's reach, so collections in the
+        # workers do not write to (and un-share) the model's pages
+        gc.collect()
+        gc.freeze()
+
+    def _on_stop(self, signum, frame):
+        self._stop = True
+
+    def _on_hup(self, signum, frame):
+        self._rolling = True
+
+    # -- processes --
+    def _spawn_worker(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker(slot)
+            except KeyboardInterrupt:
+                pass
+            except BaseException as e:
+                print(f"Worker {slot} failed: {e!r}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.pids[slot] = pid
+        self.started_at[slot] = time.monotonic()
+        self.failures[slot] = 0
+        self.ready.discard(slot)
+        print(f"Started worker {slot} (pid {pid}) on port {self.worker_ports[slot]}")
+
+    def _run_worker(self, slot: int):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # gradio closes its server gracefully on KeyboardInterrupt
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        self.sock.close()
+        _exit_with_master(self._master_pid)
+        reset_engine_after_fork()
+        _set_torch_threads(self.torch_threads)
+        _take_share_of_limits(self.workers)
+
+        vs = PGVectorStore(embeddings=self.embeddings or get_embeddings())
+        chatbot = ChatBot(vs)
+        initialize_gradio_app(
+            chatbot.get_chat_function(),
+            server_name="127.0.0.1",
+            server_port=self.worker_ports[slot],
+            inbrowser=False,
+        )
+
+    def _spawn_balancer(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
+                _exit_with_master(self._master_pid)
+                _run_balancer(self.sock, self.worker_ports)
+            finally:
+                os._exit(0)
+        self.balancer_pid = pid
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid == self.balancer_pid and not self._stop:
+                print(f"Balancer exited (status {status}), restarting")
+                self._spawn_balancer()
+                continue
+            for slot, worker_pid in list(self.pids.items()):
+                if worker_pid == pid:
+                    del self.pids[slot]
+                    if not self._stop:
+                        print(f"Worker {slot} (pid {pid}) exited (status {status}), restarting")
+                        self._spawn_worker(slot)
+
+    def _healthy(self, slot: int) -> bool:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.worker_ports[slot]}/", timeout=2) as response:
+                return response.status == 200
+        except OSError:
+            return False
+
+    def _check_health(self, slot: int):
+        if self._healthy(slot):
+            if slot not in self.ready:
+                print(f"Worker {slot} is ready")
+            self.ready.add(slot)
+            self.failures[slot] = 0
+            return
+        if slot not in self.ready and time.monotonic() - self.started_at[slot] < settings.WORKER_START_TIMEOUT_SECONDS:
+            return  # still starting up
+        self.failures[slot] += 1
+        if self.failures[slot] >= settings.WORKER_HEALTH_FAILURES:
+            print(f"Worker {slot} failed {self.failures[slot]} health checks, killing it")
+            self._kill(self.pids[slot], signal.SIGKILL)
+
+    @staticmethod
+    def _kill(pid: int, sig: int):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _stop_process(self, pid: int, terminate: bool = True):
+        """SIGTERM (graceful), then SIGKILL after WORKER_SHUTDOWN_TIMEOUT_SECONDS."""
+        if terminate:
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.WORKER_SHUTDOWN_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                    return
+            except ChildProcessError:
+                return
+            time.sleep(0.2)
+        self._kill(pid, signal.SIGKILL)
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+    def _rolling_restart(self):
+        """One worker at a time; its clients fall through to the next worker until it is back."""
+        print("Rolling restart of all workers")
+        for slot in range(self.workers):
+            if self._stop:
+                return
+            pid = self.pids.pop(slot, None)
+            if pid is not None:
+                self._stop_process(pid)
+            self._spawn_worker(slot)
+            while not self._stop and time.monotonic() - self.started_at[slot] < settings.WORKER_START_TIMEOUT_SECONDS:
+                if self._healthy(slot):
+                    self.ready.add(slot)
+                    print(f"Worker {slot} is ready")
+                    break
+                time.sleep(0.5)
+        print("Rolling restart complete")
+
+    def _shutdown(self):
+        print("Shutting down workers")
+        for pid in [*self.pids.values(), self.balancer_pid]:
+            if pid is not None:
+                self._kill(pid, signal.SIGTERM)
+        for pid in [*self.pids.values(), self.balancer_pid]:
+            if pid is not None:
+                self._stop_process(pid, terminate=False)
+        self.sock.close()
+
+
+def serve_prefork():
+    PreforkServer().run()
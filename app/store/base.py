@@ -0,0 +1,90 @@
+import time
+
+from langchain_core.documents import Document
+
+from app.config import settings
+from app.store.chunk_file import ChunkFile
+from app.utils.metrics import metrics
+
+
+class AliasedStore:
+    """
+    Common plumbing for the versioned vector stores (PGVectorStore, RedisStore).
+
+    collection_name pins the store to one physical collection/index (used while
+    re-indexing). Without it the store serves whatever COLLECTION_NAME points at and
+    follows alias swaps every COLLECTION_ALIAS_REFRESH_SECONDS.
+
+    Subclasses implement `_resolve(alias)`, `_build_store(name)` and, for id-only
+    retrieval, `_search_ids(vector, k)`.
+    """
+
+    def __init__(self, embeddings, collection_name: str | None = None):
+        self.embeddings = embeddings
+        self.alias = settings.COLLECTION_NAME
+        self.pinned = collection_name is not None
+        self.collection_name = collection_name or self._resolve(self.alias)
+        self.store = self._build_store(self.collection_name)
+        self._resolved_at = time.monotonic()
+        self._chunk_file: ChunkFile | None = None
+        self._chunk_file_name: str | None = None
+
+    @staticmethod
+    def _resolve(alias: str) -> str:
+        raise NotImplementedError
+
+    def _build_store(self, name: str):
+        raise NotImplementedError
+
+    def _search_ids(self, vector: list[float], k: int) -> list[tuple[str, float]]:
+        """(chunk id, distance) pairs, nearest first."""
+        raise NotImplementedError
+
+    def _similarity(self, distance: float) -> float:
+        """Store distance -> cosine similarity (the scale the adaptive cutoffs use)."""
+        return 1.0 - distance
+
+    def _refresh(self):
+        if self.pinned or time.monotonic() - self._resolved_at < settings.COLLECTION_ALIAS_REFRESH_SECONDS:
+            return
+        self._resolved_at = time.monotonic()
+        target = self._resolve(self.alias)
+        if target != self.collection_name:
+            print(f"Alias '{self.alias}' moved: {self.collection_name} -> {target}")
+            self.store = self._build_store(target)
+            self.collection_name = target
+
+    def _chunks(self) -> ChunkFile | None:
+        """Local chunk file for the current collection when id-only retrieval is on and it exists."""
+        if not settings.RETRIEVAL_ID_ONLY:
+            return None
+        if self._chunk_file is None or self._chunk_file_name != self.collection_name:
+            if self._chunk_file is not None:
+                # release the old version's fd and mapping, or its file's disk space stays
+                # allocated after garbage_collect_versions deletes it
+                self._chunk_file.close()
+                self._chunk_file = None
+            if not ChunkFile.exists(self.collection_name):
+                return None
+            self._chunk_file = ChunkFile(self.collection_name)
+            self._chunk_file_name = self.collection_name
+        return self._chunk_file
+
+    def _id_only_results(self, vector: list[float], k: int) -> list[tuple[Document, float]] | None:
+        """
+        (document, cosine similarity) pairs from an id-only search plus the chunk file.
+        None means "search with full payloads instead": no chunk file, or it lacks some of
+        the ids (e.g. chunks added after it was written), which would silently shrink k.
+        """
+        chunks = self._chunks()
+        if chunks is None:
+            return None
+        results = self._search_ids(vector, k)
+        docs = [chunks.get(chunk_id) for chunk_id, _ in results]
+        missing = [chunk_id for (chunk_id, _), doc in zip(results, docs) if doc is None]
+        if missing:
+            print(f"Chunk file for '{self.collection_name}' lacks {len(missing)}/{len(results)} ids "
+                  f"(first: {missing[0]}), using full payloads")
+            metrics.incr("retrieval.chunk_file_misses")
+            return None
+        return [(doc, self._similarity(distance)) for doc, (_, distance) in zip(docs, results)]
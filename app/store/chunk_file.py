@@ -0,0 +1,108 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from app.config import settings
+from app.utils.file import get_abs_path
+from app.utils.metrics import metrics
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable key for a retrieved chunk: the store id, else a hash of its text."""
+    return doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def chunk_file_paths(collection_name: str) -> tuple[Path, Path]:
+    base = get_abs_path(settings.CHUNK_STORE_DIR)
+    return base / f"{collection_name}.chunks", base / f"{collection_name}.idx.json"
+
+
+def remove_chunk_file(collection_name: str):
+    for p in chunk_file_paths(collection_name):
+        p.unlink(missing_ok=True)
+
+
+class ChunkFileWriter:
+    """
+    Appends chunk records (UTF-8 JSON, back to back) to `<collection>.chunks` and keeps
+    an `{id: [offset, length]}` index that is written to `<collection>.idx.json` on close.
+    """
+
+    def __init__(self, collection_name: str):
+        self.data_path, self.index_path = chunk_file_paths(collection_name)
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index: dict[str, list[int]] = {}
+        if self.index_path.exists() and self.data_path.exists():
+            self.index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        else:
+            self.data_path.unlink(missing_ok=True)
+        self._f = self.data_path.open("ab")
+        self._offset = self._f.tell()
+
+    def add(self, chunk_id: str, document: Document):
+        record = json.dumps({"t": document.page_content, "m": document.metadata}, ensure_ascii=False).encode("utf-8")
+        self._f.write(record)
+        self.index[chunk_id] = [self._offset, len(record)]
+        self._offset += len(record)
+
+    def close(self):
+        self._f.close()
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.index, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+
+class ChunkFile:
+    """Read-only, memory-mapped chunk texts with an in-process LRU hot cache."""
+
+    def __init__(self, collection_name: str, cache_size: int | None = None):
+        self.data_path, self.index_path = chunk_file_paths(collection_name)
+        self.index: dict[str, list[int]] = json.loads(self.index_path.read_text(encoding="utf-8"))
+        self._file = self.data_path.open("rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.index else None
+        self.cache_size = settings.CHUNK_STORE_CACHE_SIZE if cache_size is None else cache_size
+        self._cache: OrderedDict[str, Document] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def exists(collection_name: str) -> bool:
+        return all(p.exists() for p in chunk_file_paths(collection_name))
+
+    def get(self, chunk_id: str) -> Document | None:
+        with self._lock:
+            doc = self._cache.get(chunk_id)
+            if doc is not None:
+                self._cache.move_to_end(chunk_id)
+                metrics.incr("chunk_store.cache_hits")
+                return doc
+
+        entry = self.index.get(chunk_id)
+        with self._lock:
+            # copied under the lock: close() may run concurrently once the alias has moved on
+            raw = self._mm[entry[0] : entry[0] + entry[1]] if entry is not None and self._mm is not None else None
+        if raw is None:
+            metrics.incr("chunk_store.missing")
+            return None
+        record = json.loads(raw.decode("utf-8"))
+        doc = Document(id=chunk_id, page_content=record["t"], metadata=record["m"])
+        metrics.incr("chunk_store.cache_misses")
+
+        with self._lock:
+            self._cache[chunk_id] = doc
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return doc
+
+    def close(self):
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._file.close()
+            self._cache.clear()
@@ -0,0 +1,39 @@
+from app.config import settings
+
+
+def adaptive_cutoff(
+        docs_with_scores: list[tuple],
+        min_k: int | None = None,
+        max_k: int | None = None,
+        min_similarity: float | None = None,
+        min_gap: float | None = None,
+) -> list:
+    """
+    Cuts a (document, similarity) list, sorted by descending similarity, at the first
+    result below `min_similarity` or at the largest similarity drop (if that drop is at
+    least `min_gap`), whichever comes first. Always keeps between min_k and max_k results.
+    Returns the documents only.
+    """
+    min_k = settings.RETRIEVAL_MIN_K if min_k is None else min_k
+    max_k = settings.CHUNK_RETRIVAL_SIZE if max_k is None else max_k
+    min_similarity = settings.RETRIEVAL_MIN_SIMILARITY if min_similarity is None else min_similarity
+    min_gap = settings.RETRIEVAL_MIN_SCORE_GAP if min_gap is None else min_gap
+
+    items = docs_with_scores[:max_k]
+    sims = [s for _, s in items]
+    cut = len(items)
+
+    for i in range(min_k, len(sims)):
+        if sims[i] < min_similarity:
+            cut = i
+            break
+
+    best_gap, gap_at = 0.0, None
+    for i in range(max(min_k, 1), cut):
+        gap = sims[i - 1] - sims[i]
+        if gap > best_gap:
+            best_gap, gap_at = gap, i
+    if gap_at is not None and best_gap >= min_gap:
+        cut = gap_at
+
+    return [doc for doc, _ in items[: max(cut, min(min_k, len(items)))]]
@@ -0,0 +1,43 @@
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from app.config import settings
+from app.store.cutoff import adaptive_cutoff
+from app.utils.decorators import time_it
+
+
+class InMemoryStore:
+    """
+    Process-local vector store with the same interface as PGVectorStore/RedisStore.
+    Used for offline evaluation where building a real collection is not needed.
+    """
+
+    def __init__(self, embeddings, k: int | None = None):
+        self.embeddings = embeddings
+        self.store = InMemoryVectorStore(embedding=embeddings)
+        self.k = k or settings.CHUNK_RETRIVAL_SIZE
+
+    def get(self, query: str):
+        return self.get_by_vector(self.embeddings.embed_query(query))
+
+    def get_by_vector(self, vector: list[float]):
+        if settings.RETRIEVAL_ADAPTIVE_K:
+            return adaptive_cutoff(self.get_with_scores_by_vector(vector), max_k=self.k)
+        return self.store.similarity_search_by_vector(vector, k=self.k)
+
+    def get_with_scores(self, query: str, k: int | None = None):
+        """(document, cosine similarity) pairs, most similar first."""
+        return self.get_with_scores_by_vector(self.embeddings.embed_query(query), k)
+
+    def get_with_scores_by_vector(self, vector: list[float], k: int | None = None):
+        return self.store.similarity_search_with_score_by_vector(vector, k=k or self.k)
+
+    @time_it
+    def add(self, chunks):
+        for i in range(0, len(chunks), settings.CHUNKS_BATCH_SIZE):
+            batch = chunks[i : i + settings.CHUNKS_BATCH_SIZE]
+            self.store.add_documents(batch)
+            print(f"Inserted {i + len(batch)} / {len(chunks)} chunks")
+        print("Inserted all chunks")
+
+    def delete(self):
+        self.store.store.clear()
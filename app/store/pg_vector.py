@@ -1,29 +1,154 @@
+import time
+import uuid
+from functools import lru_cache
 
 from langchain_postgres import PGVector
+from psycopg.errors import UndefinedTable
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
 
 from app.config import settings
+from app.store.base import AliasedStore
+from app.store.chunk_file import ChunkFileWriter, remove_chunk_file
+from app.store.cutoff import adaptive_cutoff
 from app.utils.decorators import time_it
 
+ALIAS_TABLE = "collection_alias"
 
-class PGVectorStore:
-    def __init__(self, embeddings):
-        self.store = PGVector(
+
+@lru_cache(maxsize=1)
+def _engine():
+    return create_engine(settings.POSTGRES_DB_URI)
+
+
+def reset_engine_after_fork():
+    """Drops pooled connections inherited from the parent process without closing them (they are the parent's)."""
+    if _engine.cache_info().currsize:
+        _engine().dispose(close=False)
+
+
+def _ensure_alias_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {ALIAS_TABLE} ("
+        "alias VARCHAR PRIMARY KEY, "
+        "collection_name VARCHAR NOT NULL, "
+        "updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    ))
+
+
+def resolve_collection(alias: str) -> str:
+    """
+    Collection the alias currently points at; the alias itself if none is set.
+    Read-only: the alias table is created by the first promote(), so its absence means no alias yet.
+    """
+    try:
+        with _engine().connect() as conn:
+            row = conn.execute(
+                text(f"SELECT collection_name FROM {ALIAS_TABLE} WHERE alias = :alias"),
+                {"alias": alias},
+            ).first()
+    except ProgrammingError as e:
+        if isinstance(e.orig, UndefinedTable):
+            return alias
+        raise
+    return row[0] if row else alias
+
+
+class PGVectorStore(AliasedStore):
+    _resolve = staticmethod(resolve_collection)
+
+    def _build_store(self, collection_name: str) -> PGVector:
+        return PGVector(
             connection=settings.POSTGRES_DB_URI,
-            embeddings=embeddings,
-            collection_name=settings.COLLECTION_NAME,
+            embeddings=self.embeddings,
+            collection_name=collection_name,
             use_jsonb=True,
         )
 
     def get(self, query: str):
-        return self.store.similarity_search(query, k=settings.CHUNK_RETRIVAL_SIZE)
+        return self.get_by_vector(self.embeddings.embed_query(query))
+
+    def get_by_vector(self, vector: list[float]):
+        if settings.RETRIEVAL_ADAPTIVE_K:
+            return adaptive_cutoff(self.get_with_scores_by_vector(vector))
+        self._refresh()
+        if self._chunks() is not None:
+            return [doc for doc, _ in self.get_with_scores_by_vector(vector)]
+        return self.store.similarity_search_by_vector(vector, k=settings.CHUNK_RETRIVAL_SIZE)
+
+    def get_with_scores(self, query: str, k: int | None = None):
+        """(document, cosine similarity) pairs, most similar first."""
+        return self.get_with_scores_by_vector(self.embeddings.embed_query(query), k)
+
+    def get_with_scores_by_vector(self, vector: list[float], k: int | None = None):
+        self._refresh()
+        k = k or settings.CHUNK_RETRIVAL_SIZE
+        id_only = self._id_only_results(vector, k)
+        if id_only is not None:
+            return id_only
+        results = self.store.similarity_search_with_score_by_vector(vector, k=k)
+        # the store reports cosine distance
+        return [(doc, 1.0 - float(distance)) for doc, distance in results]
+
+    def _search_ids(self, vector: list[float], k: int) -> list[tuple[str, float]]:
+        """Id-only KNN: only ids and cosine distances travel back from Postgres."""
+        with _engine().connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT e.id, e.embedding <=> CAST(:vector AS vector) AS distance "
+                    "FROM langchain_pg_embedding e JOIN langchain_pg_collection c ON e.collection_id = c.uuid "
+                    "WHERE c.name = :name ORDER BY distance LIMIT :k"
+                ),
+                {"vector": "[" + ",".join(map(str, vector)) + "]", "name": self.collection_name, "k": k},
+            ).all()
+        return [(r[0], float(r[1])) for r in rows]
 
     @time_it
-    def add(self, chunks):
-        for i in range(0, len(chunks), settings.CHUNKS_BATCH_SIZE):
-            batch = chunks[i : i + settings.CHUNKS_BATCH_SIZE]
-            self.store.add_documents(batch)
+    def add(self, chunks, batch_size: int | None = None, throttle_seconds: float = 0.0):
+        batch_size = batch_size or settings.CHUNKS_BATCH_SIZE
+        writer = ChunkFileWriter(self.collection_name) if settings.CHUNK_STORE_ENABLED else None
+        for i in range(0, len(chunks), batch_size):
+            batch = chunks[i : i + batch_size]
+            ids = [str(uuid.uuid4()) for _ in batch]
+            self.store.add_documents(batch, ids=ids)
+            if writer is not None:
+                for chunk_id, chunk in zip(ids, batch):
+                    writer.add(chunk_id, chunk)
             print(f"Inserted {i + len(batch)} / {len(chunks)} chunks")
+            if throttle_seconds:
+                time.sleep(throttle_seconds)
+        if writer is not None:
+            writer.close()
         print("Inserted all chunks")
 
     def delete(self):
         self.store.delete_collection()
+        remove_chunk_file(self.collection_name)
+
+    def promote(self) -> str | None:
+        """Atomically point the serving alias at this collection. Returns the previous target."""
+        with _engine().begin() as conn:
+            _ensure_alias_table(conn)
+            row = conn.execute(
+                text(f"SELECT collection_name FROM {ALIAS_TABLE} WHERE alias = :alias FOR UPDATE"),
+                {"alias": self.alias},
+            ).first()
+            conn.execute(
+                text(
+                    f"INSERT INTO {ALIAS_TABLE} (alias, collection_name) VALUES (:alias, :name) "
+                    "ON CONFLICT (alias) DO UPDATE SET collection_name = EXCLUDED.collection_name, updated_at = now()"
+                ),
+                {"alias": self.alias, "name": self.collection_name},
+            )
+        return row[0] if row else None
+
+    @staticmethod
+    def list_versions() -> list[str]:
+        """Physical collections belonging to COLLECTION_NAME (the legacy unversioned one included), oldest first."""
+        alias = settings.COLLECTION_NAME
+        with _engine().begin() as conn:
+            rows = conn.execute(
+                text("SELECT name FROM langchain_pg_collection WHERE name = :alias OR name LIKE :prefix"),
+                {"alias": alias, "prefix": f"{alias}-v%"},
+            ).all()
+        return sorted(r[0] for r in rows)
@@ -1,29 +1,284 @@
-from langchain_redis import RedisVectorStore
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_redis import RedisConfig, RedisVectorStore
+from redis import Redis
+from redis.exceptions import ResponseError
+from redisvl.index import SearchIndex
+from redisvl.query import VectorQuery
+from redisvl.schema import IndexSchema
 
 from app.config import settings
+from app.store.base import AliasedStore
+from app.store.chunk_file import ChunkFileWriter, remove_chunk_file
+from app.store.cutoff import adaptive_cutoff
 from app.utils.decorators import time_it
 
 
-class RedisStore:
-    def __init__(self, embeddings):
-        self.store = RedisVectorStore(
-            redis_url=settings.REDIS_URL,
-            embeddings=embeddings,
-            index_name=settings.COLLECTION_NAME,
+def _client() -> Redis:
+    return Redis.from_url(settings.REDIS_URL)
+
+
+def _index_names(client: Redis) -> list[str]:
+    return [n.decode() if isinstance(n, bytes) else n for n in client.execute_command("FT._LIST")]
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def resolve_index(alias: str) -> str:
+    """Index the alias currently points at; the alias itself if it is not an alias."""
+    try:
+        info = _client().ft(alias).info()
+    except ResponseError:
+        return alias
+    name = info.get("index_name", alias)
+    return name.decode() if isinstance(name, bytes) else name
+
+
+def build_index_schema(index_name: str, dims: int) -> IndexSchema:
+    """RediSearch schema for a new index, driven by the REDIS_* settings."""
+    vector_attrs = {
+        "dims": dims,
+        "algorithm": settings.REDIS_INDEX_ALGORITHM.lower(),
+        "distance_metric": settings.REDIS_DISTANCE_METRIC.lower(),
+        "datatype": settings.REDIS_VECTOR_DATATYPE.lower(),
+    }
+    if settings.REDIS_INDEX_ALGORITHM.upper() == "HNSW":
+        vector_attrs.update({
+            "m": settings.REDIS_HNSW_M,
+            "ef_construction": settings.REDIS_HNSW_EF_CONSTRUCTION,
+            "ef_runtime": settings.REDIS_HNSW_EF_RUNTIME,
+        })
+    return IndexSchema.from_dict({
+        "index": {"name": index_name, "prefix": f"{index_name}:", "storage_type": "hash"},
+        "fields": [
+            {"name": "text", "type": "text"},
+            {"name": "embedding", "type": "vector", "attrs": vector_attrs},
+            *({"name": f, "type": "tag"} for f in _csv(settings.REDIS_TAG_FIELDS)),
+            *({"name": f, "type": "text"} for f in _csv(settings.REDIS_TEXT_FIELDS)),
+        ],
+    })
+
+
+class RedisStore(AliasedStore):
+    _resolve = staticmethod(resolve_index)
+
+    def __init__(self, embeddings, collection_name: str | None = None):
+        self._dims: int | None = None
+        super().__init__(embeddings, collection_name)
+
+    def _build_store(self, index_name: str) -> RedisVectorStore:
+        if self._dims is None:
+            self._dims = len(self.embeddings.embed_query("dimension probe"))
+        if index_name in _index_names(_client()):
+            # serve an existing index with the schema it was created with
+            config = RedisConfig(
+                index_name=index_name,
+                key_prefix=index_name,
+                redis_url=settings.REDIS_URL,
+                from_existing=True,
+                embedding_dimensions=self._dims,
+            )
+        else:
+            config = RedisConfig(
+                index_schema=build_index_schema(index_name, self._dims),
+                index_name=index_name,
+                key_prefix=index_name,
+                redis_url=settings.REDIS_URL,
+                embedding_dimensions=self._dims,
+                vector_datatype=settings.REDIS_VECTOR_DATATYPE.upper(),
+                distance_metric=settings.REDIS_DISTANCE_METRIC.upper(),
+                indexing_algorithm=settings.REDIS_INDEX_ALGORITHM.upper(),
+            )
+        return RedisVectorStore(embeddings=self.embeddings, config=config)
+
+    # ----------------------------
+    # Index schema helpers
+    # ----------------------------
+    def _vector_datatype(self) -> str:
+        field = self.store.index.schema.fields[self.store.config.embedding_field]
+        return field.attrs.datatype.value.lower()
+
+    def _distance_metric(self) -> str:
+        field = self.store.index.schema.fields[self.store.config.embedding_field]
+        return field.attrs.distance_metric.value.upper()
+
+    def _similarity(self, distance: float) -> float:
+        """
+        vector_distance -> cosine similarity for the metric the index was built with
+        (an existing index may differ from REDIS_DISTANCE_METRIC). COSINE reports 1 - cos,
+        IP reports 1 - dot and L2 the squared euclidean distance; IP and L2 match cosine
+        for unit-length embeddings (the default all-MiniLM-L6-v2 normalizes its output).
+        """
+        if self._distance_metric() == "L2":
+            return 1.0 - distance / 2.0
+        return 1.0 - distance
+
+    def _metadata_fields(self) -> list[str]:
+        skip = {self.store.config.content_field, self.store.config.embedding_field}
+        return [name for name in self.store.index.schema.fields if name not in skip and not name.startswith("_")]
+
+    def _strip_prefix(self, key: str) -> str:
+        prefix = f"{self.store.config.key_prefix}:"
+        return key[len(prefix):] if key.startswith(prefix) else key
+
+    def _knn(self, vector: list[float], k: int, return_fields: list[str]) -> list[dict]:
+        # built here rather than through RedisVectorStore so the query blob matches
+        # the index datatype (langchain_redis always sends FLOAT32)
+        query = VectorQuery(
+            vector=vector,
+            vector_field_name=self.store.config.embedding_field,
+            return_fields=return_fields,
+            num_results=k,
+            dtype=self._vector_datatype(),
         )
+        return self.store.index.query(query)
 
+    # ----------------------------
+    # Retrieval
+    # ----------------------------
     def get(self, query: str):
-        return self.store.similarity_search(query, k=settings.CHUNK_RETRIVAL_SIZE)
+        return self.get_by_vector(self.embeddings.embed_query(query))
+
+    def get_by_vector(self, vector: list[float]):
+        if settings.RETRIEVAL_ADAPTIVE_K:
+            return adaptive_cutoff(self.get_with_scores_by_vector(vector))
+        return [doc for doc, _ in self.get_with_scores_by_vector(vector)]
+
+    def get_with_scores(self, query: str, k: int | None = None):
+        """(document, cosine similarity) pairs, most similar first."""
+        return self.get_with_scores_by_vector(self.embeddings.embed_query(query), k)
+
+    def get_with_scores_by_vector(self, vector: list[float], k: int | None = None):
+        self._refresh()
+        k = k or settings.CHUNK_RETRIVAL_SIZE
+        id_only = self._id_only_results(vector, k)
+        if id_only is not None:
+            return id_only
+
+        content_field = self.store.config.content_field
+        metadata_fields = self._metadata_fields()
+        results = self._knn(vector, k, [content_field, *metadata_fields])
+        return [
+            (
+                Document(
+                    id=self._strip_prefix(r["id"]),
+                    page_content=r.get(content_field, ""),
+                    metadata={f: r[f] for f in metadata_fields if f in r},
+                ),
+                self._similarity(float(r["vector_distance"])),
+            )
+            for r in results
+        ]
+
+    def _search_ids(self, vector: list[float], k: int) -> list[tuple[str, float]]:
+        """Id-only KNN: FT.SEARCH returns just the keys and distances (RETURN 1 vector_distance)."""
+        results = self._knn(vector, k, [])
+        return [(self._strip_prefix(r["id"]), float(r["vector_distance"])) for r in results]
 
+    # ----------------------------
+    # Ingestion
+    # ----------------------------
     @time_it
-    def add(self, chunks):
-        for i in range(0, len(chunks), settings.CHUNKS_BATCH_SIZE):
-            batch = chunks[i : i + settings.CHUNKS_BATCH_SIZE]
-            self.store.add_documents(batch)
+    def add(self, chunks, batch_size: int | None = None, throttle_seconds: float = 0.0):
+        """
+        Bulk load: embeds a batch at a time and writes the hashes through a
+        non-transactional pipeline, one round trip per batch.
+        """
+        batch_size = batch_size or settings.CHUNKS_BATCH_SIZE
+        writer = ChunkFileWriter(self.collection_name) if settings.CHUNK_STORE_ENABLED else None
+        client = self.store.index.client
+        content_field = self.store.config.content_field
+        embedding_field = self.store.config.embedding_field
+        metadata_fields = self._metadata_fields()
+        dtype = np.dtype(self._vector_datatype())
+        separator = self.store.config.default_tag_separator
+
+        start = time.perf_counter()
+        for i in range(0, len(chunks), batch_size):
+            batch = chunks[i : i + batch_size]
+            ids = [str(uuid.uuid4()) for _ in batch]
+            vectors = self.embeddings.embed_documents([c.page_content for c in batch])
+
+            pipe = client.pipeline(transaction=False)
+            for chunk_id, chunk, vector in zip(ids, batch, vectors):
+                mapping = {
+                    content_field: chunk.page_content,
+                    embedding_field: np.asarray(vector, dtype=dtype).tobytes(),
+                }
+                for field in metadata_fields:
+                    value = chunk.metadata.get(field)
+                    if value is None:
+                        continue
+                    mapping[field] = separator.join(map(str, value)) if isinstance(value, list) else str(value)
+                pipe.hset(f"{self.store.config.key_prefix}:{chunk_id}", mapping=mapping)
+            pipe.execute()
+
+            if writer is not None:
+                for chunk_id, chunk in zip(ids, batch):
+                    writer.add(chunk_id, chunk)
             print(f"Inserted {i + len(batch)} / {len(chunks)} chunks")
+            if throttle_seconds:
+                time.sleep(throttle_seconds)
+        elapsed = time.perf_counter() - start
+
+        if writer is not None:
+            writer.close()
         print("Inserted all chunks")
+        print(f"Load rate: {len(chunks) / elapsed if elapsed else 0.0:.1f} chunks/sec")
+        self.print_memory_usage()
+
+    def print_memory_usage(self):
+        client = self.store.index.client
+        info = client.ft(self.collection_name).info()
+        memory = client.info("memory")
+        print("========== Redis Memory ==========")
+        print(f"Index              : {self.collection_name}")
+        print(f"Vector datatype    : {self._vector_datatype().upper()}")
+        print(f"Documents          : {info.get('num_docs')}")
+        print(f"Vector index (MB)  : {info.get('vector_index_sz_mb')}")
+        print(f"Inverted index (MB): {info.get('inverted_sz_mb')}")
+        print(f"Redis used memory  : {memory.get('used_memory_human')}")
+        print("==================================")
 
     def delete(self):
-        self.store.delete(delete_all=True)
+        # drops the index together with its documents
+        self.store.index.delete(drop=True)
+        remove_chunk_file(self.collection_name)
+
+    def promote(self) -> str | None:
+        """
+        Atomically point the serving alias at this index (FT.ALIASUPDATE). Returns the previous target.
+        Old versions are left in place; garbage_collect_versions drops them after the grace period.
+        """
+        client = _client()
+        previous = resolve_index(self.alias)
+        if self.alias not in _index_names(client):
+            client.ft(self.collection_name).aliasupdate(self.alias)
+            return previous if previous != self.collection_name else None
+
+        # a legacy index carries the alias name itself. Keep its documents as a regular (oldest)
+        # version for rollback and GC, then drop the legacy definition and take over the name in
+        # one transaction, so the name always resolves to an index
+        legacy = SearchIndex.from_existing(self.alias, redis_client=client)
+        schema = legacy.schema.to_dict()
+        schema["index"]["name"] = f"{self.alias}-v{'0' * 14}"
+        SearchIndex.from_dict(schema, redis_client=client).create(overwrite=False)
+        print(f"Legacy index '{self.alias}' kept as version '{schema['index']['name']}'")
+        pipe = client.pipeline(transaction=True)
+        pipe.execute_command("FT.DROPINDEX", self.alias)
+        pipe.execute_command("FT.ALIASUPDATE", self.alias, self.collection_name)
+        pipe.execute()
+        return schema["index"]["name"]
+
+    @staticmethod
+    def list_versions() -> list[str]:
+        """Physical indexes belonging to COLLECTION_NAME (the legacy unversioned one included), oldest first."""
+        alias = settings.COLLECTION_NAME
+        return sorted(n for n in _index_names(_client()) if n == alias or n.startswith(f"{alias}-v"))
 
-# https://redis.io/blog/langchain-redis-partner-package/
\ No newline at end of file
+# https://redis.io/blog/langchain-redis-partner-package/
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+class Overloaded(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"Stage '{stage}' is overloaded")
+        self.stage = stage
+
+
+class StageLimiter:
+    """
+    Bounds the number of concurrent calls into one stage (embedding, db, llm).
+    Callers wait at most `max_wait_s` for a slot and are rejected with Overloaded after that.
+    A limit <= 0 disables the stage limit.
+    """
+
+    def __init__(self, name: str, limit: int, max_wait_s: float):
+        self.name = name
+        self.limit = limit
+        self.max_wait_s = max_wait_s
+        self._sem = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+
+    def _update(self, waiting: int = 0, in_flight: int = 0):
+        with self._lock:
+            self._waiting += waiting
+            self._in_flight += in_flight
+            metrics.gauge(f"admission.{self.name}.waiting", self._waiting)
+            metrics.gauge(f"admission.{self.name}.in_flight", self._in_flight)
+
+    @contextmanager
+    def slot(self):
+        if self._sem is None:
+            yield
+            return
+
+        self._update(waiting=1)
+        start = time.perf_counter()
+        acquired = self._sem.acquire(timeout=self.max_wait_s)
+        metrics.observe(f"admission.{self.name}.wait_ms", (time.perf_counter() - start) * 1000.0)
+        self._update(waiting=-1)
+        if not acquired:
+            metrics.incr(f"admission.{self.name}.rejected")
+            raise Overloaded(self.name)
+
+        self._update(in_flight=1)
+        try:
+            yield
+        finally:
+            self._update(in_flight=-1)
+            self._sem.release()
+
+
+class SessionRateLimiter:
+    """Token bucket per session id (`per_minute` refill, `burst` capacity), LRU-bounded."""
+
+    def __init__(self, per_minute: int, burst: int, max_sessions: int = 10_000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_sessions = max_sessions
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, session_id: str | None) -> bool:
+        if self.rate <= 0 or not session_id:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(session_id, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[session_id] = (tokens, now)
+            while len(self._buckets) > self.max_sessions:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            metrics.incr("admission.session.rate_limited")
+        return allowed
+
+
+class AdmissionController:
+    def __init__(self):
+        self.reconfigure()
+
+    def reconfigure(self):
+        """(Re)builds the limiters from the current settings, e.g. after a pre-fork worker took its share."""
+        enabled = settings.ADMISSION_ENABLED
+        wait = settings.ADMISSION_MAX_WAIT_SECONDS
+        self.stages = {
+            "embedding": StageLimiter("embedding", settings.ADMISSION_EMBEDDING_CONCURRENCY if enabled else 0, wait),
+            "db": StageLimiter("db", settings.ADMISSION_DB_CONCURRENCY if enabled else 0, wait),
+            "llm": StageLimiter("llm", settings.ADMISSION_LLM_CONCURRENCY if enabled else 0, wait),
+        }
+        self.sessions = SessionRateLimiter(
+            per_minute=settings.SESSION_RATE_LIMIT_PER_MINUTE if enabled else 0,
+            burst=settings.SESSION_RATE_LIMIT_BURST,
+        )
+
+    def stage(self, name: str):
+        return self.stages[name].slot()
+
+    def allow_session(self, session_id: str | None) -> bool:
+        return self.sessions.allow(session_id)
+
+
+admission = AdmissionController()
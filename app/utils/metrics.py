@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """
+    Tiny in-process metrics registry (counters, gauges and sample distributions).
+    Thread-safe; samples are kept in a bounded window per name.
+    """
+
+    def __init__(self, max_samples: int = 10_000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._samples: dict[str, list[float]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            samples = self._samples.setdefault(name, [])
+            samples.append(value)
+            if len(samples) > self.max_samples:
+                del samples[: len(samples) - self.max_samples]
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the elapsed wall time of the block in milliseconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000.0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {k: list(v) for k, v in self._samples.items()}
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "distributions": {k: _summarize(v) for k, v in samples.items()},
+        }
+
+    def start_periodic_log(self, interval_s: float, before=None) -> threading.Thread | None:
+        """
+        Prints the snapshot as one JSON line ({"event": "metrics", "pid": ..., ...}) every
+        interval_s seconds from a daemon thread. `before` runs first, e.g. to sample gauges.
+        """
+        if interval_s <= 0:
+            return None
+
+        def run():
+            while True:
+                time.sleep(interval_s)
+                if before is not None:
+                    before()
+                line = {"event": "metrics", "pid": os.getpid(), "ts": round(time.time(), 3), **self.snapshot()}
+                print(json.dumps(line), flush=True)
+
+        thread = threading.Thread(target=run, name="metrics-log", daemon=True)
+        thread.start()
+        return thread
+
+    def print_report(self, prefix: str = ""):
+        snap = self.snapshot()
+        print("============ Metrics ============")
+        for k, v in sorted(snap["counters"].items()):
+            if k.startswith(prefix):
+                print(f"{k:<40}: {v:g}")
+        for k, v in sorted(snap["gauges"].items()):
+            if k.startswith(prefix):
+                print(f"{k:<40}: {v:g}")
+        for k, d in sorted(snap["distributions"].items()):
+            if k.startswith(prefix):
+                print(
+                    f"{k:<40}: n={d['count']} mean={d['mean']:.2f} "
+                    f"p50={d['p50']:.2f} p95={d['p95']:.2f} p99={d['p99']:.2f} max={d['max']:.2f}"
+                )
+        print("=================================")
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q / 100.0 * (len(s) - 1)))))
+    return s[idx]
+
+
+def _summarize(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+metrics = Metrics()
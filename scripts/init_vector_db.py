@@ -0,0 +1,18 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from app.init import initialize_vector_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="First-run ingestion of the Redis docs into the vector store")
+    parser.add_argument("--reset", action="store_true", help="rebuild into a new collection version")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    initialize_vector_database(by_reset=args.reset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Local OpenAI-compatible stand-in for /v1/chat/completions, for offline load tests.
+
+    uv run python -m scripts.llm_stub_server --ttft-ms 300 --tokens-per-sec 60 --error-rate 0.01
+    OPENAI_BASE_URL=http://localhost:8089/v1 OPENAI_API_KEY=stub uv run python main.py
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "redis stores data in memory and persists it with rdb snapshots or the append only file "
+    "use expire to set a ttl streams keep an append only log consumer groups track delivery"
+).split()
+
+
+class StubConfig:
+    ttft_ms: float = 300.0
+    tokens_per_sec: float = 60.0
+    output_tokens: int = 120
+    error_rate: float = 0.0
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+
+def _prompt_tokens(body: dict) -> int:
+    # rough estimate: ~4 characters per token
+    chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    return max(1, chars // 4)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = StubConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        cfg = self.config
+
+        if random.random() < cfg.error_rate:
+            self._send_json(500, {"error": {"message": "stub injected error", "type": "server_error"}})
+            return
+
+        model = body.get("model", "stub")
+        tokens = [random.choice(WORDS) for _ in range(cfg.output_tokens)]
+        prompt_tokens = _prompt_tokens(body)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        per_token = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+
+        time.sleep(cfg.ttft_ms / 1000.0)
+
+        if not body.get("stream"):
+            time.sleep(per_token * len(tokens))
+            self._send_json(200, {
+                "id": _completion_id(),
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        cid = _completion_id()
+
+        def send_chunk(delta: dict, finish_reason=None, with_usage: bool = False):
+            chunk = {
+                "id": cid,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if with_usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send_chunk({"role": "assistant", "content": ""})
+        for i, tok in enumerate(tokens):
+            send_chunk({"content": tok if i == 0 else f" {tok}"})
+            time.sleep(per_token)
+        send_chunk({}, finish_reason="stop", with_usage=True)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft-ms", type=float, default=StubConfig.ttft_ms)
+    parser.add_argument("--tokens-per-sec", type=float, default=StubConfig.tokens_per_sec)
+    parser.add_argument("--output-tokens", type=int, default=StubConfig.output_tokens)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    args = parser.parse_args()
+
+    cfg = StubConfig()
+    cfg.ttft_ms = args.ttft_ms
+    cfg.tokens_per_sec = args.tokens_per_sec
+    cfg.output_tokens = args.output_tokens
+    cfg.error_rate = args.error_rate
+    StubHandler.config = cfg
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/v1 (ttft={cfg.ttft_ms}ms, {cfg.tokens_per_sec} tok/s, errors={cfg.error_rate:.1%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Concurrent multi-turn load generator for the chat path.
+
+    # in-process: drives ChatBot.get_chat_function() directly (per-stage latencies included)
+    OPENAI_BASE_URL=http://localhost:8089/v1 uv run python -m scripts.load_test --sessions 16 --turns 4
+
+    # over HTTP against a running Gradio app
+    uv run python -m scripts.load_test --mode http --url http://localhost:7860 --sessions 16 --turns 4
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from app.config import settings
+from app.utils import load_jsonl
+from app.utils.metrics import metrics, percentile
+
+FOLLOW_UPS = [
+    "Can you give me a short example?",
+    "How does that behave in a cluster?",
+    "What are the performance implications?",
+    "Thanks! Can you summarize that in two sentences?",
+]
+
+
+def _session_messages(questions: list[str], turns: int, rng: random.Random) -> list[str]:
+    return [rng.choice(questions)] + [rng.choice(FOLLOW_UPS) for _ in range(turns - 1)]
+
+
+def _function_session_runner():
+    from app.chatbot.openai import ChatBot
+    from app.embeddings import get_embeddings
+    from app.store.pg_vector import PGVectorStore
+
+    chat = ChatBot(PGVectorStore(embeddings=get_embeddings())).get_chat_function()
+
+    def run(messages: list[str], record):
+        history = []
+        for message in messages:
+            start = time.perf_counter()
+            try:
+                answer = chat(message, history)
+                record(time.perf_counter() - start, None)
+            except Exception as e:
+                record(time.perf_counter() - start, e)
+                return
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": answer})
+
+    return run
+
+
+def _http_session_runner(url: str, api_name: str):
+    from gradio_client import Client
+
+    def run(messages: list[str], record):
+        # one client per session: the chat history lives in that client's server-side state
+        client = Client(url, verbose=False)
+        for message in messages:
+            start = time.perf_counter()
+            try:
+                client.predict(message, api_name=api_name)
+                record(time.perf_counter() - start, None)
+            except Exception as e:
+                record(time.perf_counter() - start, e)
+                return
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chat load generator")
+    parser.add_argument("--mode", choices=["function", "http"], default="function")
+    parser.add_argument("--url", default="http://localhost:7860")
+    parser.add_argument("--api-name", default="/redis_chat")
+    parser.add_argument("--sessions", type=int, default=8, help="total simulated sessions")
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions running at the same time")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--max-retries", type=int, default=0,
+        help="OpenAI client retries in function mode; 0 counts every LLM error (http mode: set OPENAI_MAX_RETRIES on the server)",
+    )
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    rng = random.Random(args.seed)
+    questions = [q["question"] for q in load_jsonl("app/queries/queries.jsonl")]
+    sessions = [_session_messages(questions, args.turns, rng) for _ in range(args.sessions)]
+
+    if args.mode == "function":
+        # client retries would hide injected errors and fold their backoff into the latency
+        settings.OPENAI_MAX_RETRIES = args.max_retries
+        run = _function_session_runner()
+    else:
+        run = _http_session_runner(args.url, args.api_name)
+
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+
+    def record(seconds: float, error):
+        with lock:
+            if error is None:
+                latencies.append(seconds * 1000.0)
+            else:
+                name = type(error).__name__
+                errors[name] = errors.get(name, 0) + 1
+
+    metrics.reset()
+    print(f"Running {args.sessions} sessions x {args.turns} turns ({args.mode}, concurrency={args.concurrency})")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+        list(ex.map(lambda messages: run(messages, record), sessions))
+    elapsed = time.perf_counter() - start
+
+    ok = len(latencies)
+    failed = sum(errors.values())
+    total = ok + failed
+    print("========== Load Test ==========")
+    print(f"Wall time              : {elapsed:.1f}s")
+    print(f"Turns ok / failed      : {ok} / {failed}")
+    print(f"Throughput             : {ok / elapsed if elapsed else 0.0:.2f} turns/s")
+    print(f"Error rate             : {(failed / total * 100.0) if total else 0.0:.1f}%")
+    print(f"Turn latency p50       : {percentile(latencies, 50):.0f} ms")
+    print(f"Turn latency p95       : {percentile(latencies, 95):.0f} ms")
+    print(f"Turn latency p99       : {percentile(latencies, 99):.0f} ms")
+    for name, count in sorted(errors.items()):
+        print(f"  {name:<20} : {count}")
+    print("===============================")
+    if args.mode == "function":
+        metrics.print_report(prefix="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from app.ingestion.reindex import rebuild_collection
+from app.store.pg_vector import PGVectorStore
+from app.store.redis_vector import RedisStore
+
+STORES = {"pg": PGVectorStore, "redis": RedisStore}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Blue/green re-index of the vector store collection")
+    parser.add_argument("--store", choices=sorted(STORES), default="pg")
+    parser.add_argument("--gc-grace-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    rebuild_collection(STORES[args.store], gc_grace_seconds=args.gc_grace_seconds)
+
+
+if __name__ == "__main__":
+    main()